@@ -0,0 +1,93 @@
+import uuid
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+
+# Backends that keep entries inside one process, so a Celery worker and the web
+# process never see each other's writes or invalidations
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared() -> bool:
+    """Check whether the default cache is visible to every process (e.g. Redis or Memcached)"""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def cached(ttl, key_fn):
+    """Cache a function's return value in Django's cache under key_fn(*args, **kwargs)"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_fn(*args, **kwargs)
+            result = cache.get(key)
+            if result is None:
+                result = func(*args, **kwargs)
+                cache.set(key, result, ttl)
+            return result
+        return wrapper
+    return decorator
+
+
+# Serialized chart payloads are kept for a day; the key carries a fingerprint of
+# the symbol's signals and data file (see chart_service.chart_cache_key)
+CHART_CACHE_TTL = 60 * 60 * 24
+
+
+# Signal_Summary rows for the Excel export, kept for an hour; the key carries a
+# fingerprint of the rows themselves (see export_service.signal_summary_cache_key)
+SIGNAL_SUMMARY_CACHE_TTL = 60 * 60
+
+
+# Distinct symbols that have signals, for the signals page filter
+SIGNAL_SYMBOLS_CACHE_KEY = 'signal_symbols'
+SIGNAL_SYMBOLS_CACHE_TTL = 120
+
+
+def get_signal_symbols(loader):
+    """Cached list of symbols with signals; loader runs on a miss"""
+    return cache.get_or_set(SIGNAL_SYMBOLS_CACHE_KEY, loader, SIGNAL_SYMBOLS_CACHE_TTL)
+
+
+def invalidate_signal_symbols():
+    """Drop the cached symbol list after signals are replaced"""
+    cache.delete(SIGNAL_SYMBOLS_CACHE_KEY)
+
+
+# The stored API credentials row, read on most requests. The TTL is kept short
+# and every save or delete of a row drops it (see APICredentials.save)
+API_CREDENTIALS_CACHE_KEY = 'api_credentials'
+API_CREDENTIALS_CACHE_TTL = 60
+
+
+def get_api_credentials():
+    """Cached APICredentials.objects.first()"""
+    from .models import APICredentials
+    return cache.get_or_set(API_CREDENTIALS_CACHE_KEY, APICredentials.objects.first, API_CREDENTIALS_CACHE_TTL)
+
+
+def invalidate_api_credentials():
+    """Drop the cached credentials after a row changes"""
+    cache.delete(API_CREDENTIALS_CACHE_KEY)
+
+
+# Workbooks built by a background export wait here for their download. Only
+# reachable when celery_enabled(), which requires cache_is_shared()
+EXPORT_CACHE_TTL = 60 * 15
+
+
+def store_export(filename, content):
+    """Keep a generated file for download; returns its download token"""
+    if not cache_is_shared():
+        # The web process serving the download could never read it back
+        raise RuntimeError('Background exports need a shared cache backend such as Redis')
+    token = uuid.uuid4().hex
+    cache.set(f"export:{token}", (filename, content), EXPORT_CACHE_TTL)
+    return token
+
+
+def get_export(token):
+    """(filename, content) of a stored export, or None once it has expired"""
+    return cache.get(f"export:{token}")
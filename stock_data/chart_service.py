@@ -0,0 +1,135 @@
+import logging
+import os
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import Count, Max
+from .models import TradingSignal
+from .indicators import macd, moving_average
+from .cache import CHART_CACHE_TTL
+from .services import get_default_kite_service, get_parquet_path, json_dumps_bytes, load_json_file
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+
+def chart_cache_key(backtest):
+    """Cache key for a backtest's chart payload, fingerprinted by the symbol's signals and newest data file"""
+    # Read from the database and the data directory on every call, so a strategy
+    # run or data fetch in any process retires the cached payload
+    fingerprint = TradingSignal.objects.filter(symbol=backtest.symbol).order_by().aggregate(
+        last_id=Max('id'), count=Count('id')
+    )
+    files = get_default_kite_service().data_files_by_symbol().get(backtest.symbol, [])
+    try:
+        data_version = os.stat(files[0]['filepath']).st_mtime_ns if files else 0
+    except OSError:
+        data_version = 0  # Removed since the listing was cached
+    return f"chart:{backtest.id}:{fingerprint['last_id']}:{fingerprint['count']}:{data_version}"
+
+
+def build_chart_data(backtest):
+    """Collect a backtest's backtest_info, OHLC candles, MA/MACD indicators and signals"""
+    # Served by the (symbol, timestamp) index; only the charted columns are fetched
+    signals = TradingSignal.objects.filter(
+        symbol=backtest.symbol,
+        timestamp__gte=backtest.from_date,
+        timestamp__lte=backtest.to_date,
+        price__gt=0
+    ).order_by('timestamp').values_list('timestamp', 'signal_type', 'price', 'confidence')
+
+    kite_service = get_default_kite_service()
+
+    ohlc_data = []
+    indicators_data = {
+        'macd': [],
+        'ma': []
+    }
+
+    # Newest file for the symbol first; older ones are fallbacks if it fails to load
+    for file_info in kite_service.data_files_by_symbol().get(backtest.symbol, []):
+        logger.info(f"Chart data: Found matching symbol file: {file_info['filepath']}")
+        try:
+            parquet_path = get_parquet_path(file_info['filepath'])
+            if pq is not None and os.path.exists(parquet_path):
+                # Columnar copy: read only the OHLCV columns
+                df = pd.read_parquet(parquet_path, columns=['date', 'open', 'high', 'low', 'close', 'volume'])
+            else:
+                file_data = load_json_file(file_info['filepath'])
+                # Load all records once and validate OHLC columns vectorized
+                df = pd.DataFrame(file_data.get('data', []))
+            logger.info(f"Chart data: Loaded file with {len(df)} records")
+
+            if 'date' not in df.columns and 'timestamp' in df.columns:
+                df = df.rename(columns={'timestamp': 'date'})
+            price_cols = ['open', 'high', 'low', 'close']
+            df[price_cols + ['volume']] = df[price_cols + ['volume']].apply(pd.to_numeric, errors='coerce')
+            df['volume'] = df['volume'].fillna(0).astype('int64')
+            df = df[(df[price_cols] > 0).all(axis=1) & df['date'].notna()]
+            # Keep OHLC column-wise and only build the per-candle dicts the
+            # chart expects at serialization time
+            dates = df['date'].tolist()
+            opens, highs, lows, closes = (df[col].tolist() for col in price_cols)
+            ohlc_data = [
+                {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+                for d, o, h, l, c, v in zip(dates, opens, highs, lows, closes, df['volume'].tolist())
+            ]
+            logger.info(f"Chart data: Extracted {len(ohlc_data)} valid OHLC records")
+
+            if len(ohlc_data) >= 26:
+                close = df['close'].to_numpy()
+                ma5 = moving_average(close, 5)
+                # Single-pass EMA recurrence shared with the strategy service
+                macd_line, signal_line, histogram = macd(close)
+                indicators_data['ma'] = [
+                    {'date': d, 'value': v}
+                    for d, v in zip(dates[4:], ma5.tolist()[4:])
+                ]
+                indicators_data['macd'] = [
+                    {'date': d, 'macd': m, 'signal': sig, 'histogram': h}
+                    for d, m, sig, h in zip(dates[25:], macd_line.tolist()[25:],
+                                            signal_line.tolist()[25:], histogram.tolist()[25:])
+                ]
+            break
+        except Exception as e:
+            logger.error(f"Chart data: Error loading data file: {e}")
+            continue
+
+    # Non-positive prices are filtered in the query, so rows need no per-row checks
+    signals_data = [
+        {
+            'timestamp': timestamp.isoformat(),
+            'signal_type': signal_type,
+            'price': float(price),
+            'confidence': confidence
+        }
+        for timestamp, signal_type, price, confidence in signals.iterator(chunk_size=1000)
+    ]
+
+    logger.info(f"Chart data: Returning {len(ohlc_data)} OHLC, {len(signals_data)} signals, {len(indicators_data['macd'])} MACD, {len(indicators_data['ma'])} MA")
+
+    backtest_info = {
+        'symbol': backtest.symbol,
+        'from_date': backtest.from_date.strftime('%Y-%m-%d'),
+        'to_date': backtest.to_date.strftime('%Y-%m-%d'),
+        'strategy_name': backtest.strategy.name
+    }
+
+    return backtest_info, ohlc_data, indicators_data, signals_data
+
+
+def cache_chart_payload(backtest, cache_key=None):
+    """Build a backtest's chart JSON, store it in the chart cache and return it"""
+    backtest_info, ohlc_data, indicators_data, signals_data = build_chart_data(backtest)
+    # Serialized with orjson when installed; the payload is mostly float arrays
+    payload = json_dumps_bytes({
+        'success': True,
+        'ohlc_data': ohlc_data,
+        'signals': signals_data,
+        'indicators': indicators_data,
+        'backtest_info': backtest_info
+    })
+    cache.set(cache_key or chart_cache_key(backtest), payload, CHART_CACHE_TTL)
+    return payload
@@ -0,0 +1,347 @@
+import csv
+import tempfile
+from datetime import datetime
+from itertools import islice
+import pandas as pd
+from django.db.models import Avg, Min, Max, Count
+from django.db.models.fields.json import KeyTransform
+from .models import TradingSignal, TradingStrategy, StrategyBacktest
+from .cache import SIGNAL_SUMMARY_CACHE_TTL, cached
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Content type of the generated workbooks
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Workbooks are built in memory up to this size, then spill to a temporary file
+EXPORT_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+# Rows fetched per database round trip when exporting signals
+EXPORT_CHUNK_SIZE = 2000
+
+# Signal export: database fields -> sheet columns, and indicator keys -> sheet columns
+EXPORT_SIGNAL_FIELDS = ('timestamp', 'symbol', 'strategy__name', 'signal_type', 'price', 'confidence', 'indicators', 'created_at')
+EXPORT_SIGNAL_COLUMNS = {
+    'timestamp': 'Timestamp', 'symbol': 'Symbol', 'strategy__name': 'Strategy', 'signal_type': 'Signal_Type',
+    'price': 'Price', 'confidence': 'Confidence', 'created_at': 'Created_At',
+}
+EXPORT_INDICATOR_COLUMNS = {
+    'MA_5': 'MA_5', 'MACD': 'MACD', 'MACD_Signal': 'MACD_Signal', 'MACD_Histogram': 'MACD_Histogram',
+    'close': 'Close_Price', 'volume': 'Volume',
+}
+
+# Trade_Signals sheet: database fields -> sheet columns, then its indicator columns
+TRADE_SIGNAL_COLUMNS = {
+    'timestamp': 'Timestamp', 'signal_type': 'Signal_Type', 'price': 'Price', 'confidence': 'Confidence',
+    'indicators': 'Indicators',
+}
+TRADE_INDICATOR_COLUMNS = {
+    'MA_5': 'MA_5', 'MACD': 'MACD', 'MACD_Signal': 'MACD_Signal', 'MACD_Histogram': 'MACD_Histogram',
+    'volume': 'Volume',
+}
+
+# Signal_Summary row for a signal type with no signals
+EMPTY_SIGNAL_STATS = {'Count': 0, 'Avg_Price': 0, 'Avg_Confidence': 0, 'Min_Price': 0, 'Max_Price': 0}
+
+# Backtest_Results sheet: database fields and results_data metrics -> sheet columns, in sheet order
+EXPORT_BACKTEST_COLUMNS = {
+    'id': 'Backtest_ID', 'symbol': 'Symbol', 'strategy__name': 'Strategy', 'from_date': 'From_Date',
+    'to_date': 'To_Date', 'total_trades': 'Total_Trades', 'winning_trades': 'Winning_Trades',
+    'losing_trades': 'Losing_Trades', 'win_rate': 'Win_Rate_%', 'total_return': 'Total_Return_%',
+    'strategy_return': 'Strategy_Return_%', 'market_return': 'Market_Return_%',
+    'buy_signals_count': 'Buy_Signals_Count', 'sell_signals_count': 'Sell_Signals_Count',
+    'max_drawdown_pct': 'Max_Drawdown_%', 'sharpe': 'Sharpe_Ratio', 'created_at': 'Created_At',
+    'profit_factor': 'Profit_Factor',  # Performance_Comparison only
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output"""
+    def write(self, value):
+        return value
+
+
+def signal_csv_lines(signals):
+    """Yield the signals export as CSV text, header first, in EXPORT_CHUNK_SIZE batches"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([
+        'Timestamp', 'Symbol', 'Strategy', 'Signal_Type', 'Price', 'Confidence',
+        *EXPORT_INDICATOR_COLUMNS.values(), 'Created_At'
+    ])
+    rows = signals.values_list(*EXPORT_SIGNAL_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while batch := list(islice(rows, EXPORT_CHUNK_SIZE)):
+        lines = []
+        for timestamp, symbol, strategy, signal_type, price, confidence, indicators, created_at in batch:
+            lines.append(writer.writerow([
+                timestamp.replace(tzinfo=None), symbol, strategy, signal_type, price, confidence,
+                *(indicators.get(key) or '' for key in EXPORT_INDICATOR_COLUMNS),
+                created_at.replace(tzinfo=None),
+            ]))
+        yield ''.join(lines)
+
+
+def _trade_signals_frame(signals):
+    """Trade_Signals columns for a signals queryset, numbering each BUY as a new trade"""
+    rows = signals.values_list(*TRADE_SIGNAL_COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    frame = pd.DataFrame.from_records(rows, columns=list(TRADE_SIGNAL_COLUMNS)).rename(columns=TRADE_SIGNAL_COLUMNS)
+    # Naive UTC datetimes for Excel compatibility
+    frame['Timestamp'] = pd.to_datetime(frame['Timestamp'], utc=True).dt.tz_localize(None)
+    for column in ('Price', 'Confidence'):
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0.0).astype(float)
+    is_buy = frame['Signal_Type'] == 'BUY'
+    frame.insert(0, 'Trade_Number', is_buy.cumsum().astype(object).where(is_buy, ''))
+    return frame
+
+
+def _indicator_frame(indicators, columns):
+    """Expand indicator dicts into sheet columns; missing or zero values export blank"""
+    # indicators is NOT NULL with default=dict, so every value is a dict
+    frame = pd.DataFrame.from_records(list(indicators), columns=list(columns))
+    for key, column in columns.items():
+        values = pd.to_numeric(frame[key], errors='coerce')
+        present = values.notna() & (values != 0)
+        if column == 'Volume':
+            values = values.where(present, 0).astype('int64')
+        frame[key] = values.astype(object).where(present, '')
+    return frame.rename(columns=columns)
+
+
+def _export_file():
+    """Seekable file for a workbook; FileResponse serves it without another copy"""
+    return tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, suffix='.xlsx')
+
+
+def _excel_writer(output):
+    """ExcelWriter on xlsxwriter when it is installed, openpyxl otherwise"""
+    if xlsxwriter is not None:
+        # No constant_memory: to_excel emits cells column by column, which that mode drops.
+        # Plain text cells skip xlsxwriter's per-string URL detection
+        return pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {'strings_to_urls': False}})
+    return pd.ExcelWriter(output, engine='openpyxl')
+
+
+def _backtest_results_frame(backtests):
+    """Backtest_Results columns for a backtests queryset, plus the Profit_Factor the comparison sheet uses"""
+    # results_data metrics are pulled out of the JSON by the database
+    rows = backtests.annotate(
+        win_rate=KeyTransform('win_rate', 'results_data'),
+        max_drawdown_pct=KeyTransform('max_drawdown', 'results_data'),
+        sharpe=KeyTransform('sharpe_ratio', 'results_data'),
+        profit_factor=KeyTransform('profit_factor', 'results_data'),
+    ).values_list(*EXPORT_BACKTEST_COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    frame = pd.DataFrame.from_records(rows, columns=list(EXPORT_BACKTEST_COLUMNS)).rename(columns=EXPORT_BACKTEST_COLUMNS)
+
+    for column in ('Win_Rate_%', 'Max_Drawdown_%', 'Sharpe_Ratio', 'Profit_Factor'):
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0.0)
+    for column in ('Total_Return_%', 'Strategy_Return_%', 'Market_Return_%'):
+        frame[column] = frame[column].astype(float)
+    # Convert timezone-aware datetimes to naive datetimes for Excel compatibility
+    frame['Created_At'] = pd.to_datetime(frame['Created_At'], utc=True).dt.tz_localize(None)
+    return frame
+
+
+def strategy_signals(symbol, strategy_id=None):
+    """Signals exported for a symbol, optionally for one strategy, oldest first"""
+    signals = TradingSignal.objects.filter(symbol=symbol)
+    if strategy_id:
+        signals = signals.filter(strategy_id=strategy_id)
+    return signals.order_by('timestamp')
+
+
+def signal_summary_cache_key(symbol, strategy_id=None):
+    """Cache key for a signal summary, fingerprinted by the newest signal id and the row count"""
+    # Checked in the database on every call, so inserts and deletes from any
+    # process or path (including cascades) retire the cached rows
+    fingerprint = strategy_signals(symbol, strategy_id).order_by().aggregate(last_id=Max('id'), count=Count('id'))
+    return f"signal_summary:{symbol}:{strategy_id or ''}:{fingerprint['last_id']}:{fingerprint['count']}"
+
+
+@cached(SIGNAL_SUMMARY_CACHE_TTL, signal_summary_cache_key)
+def signal_summary(symbol, strategy_id=None):
+    """Signal_Summary rows: count, average and price range per signal type"""
+    # One grouped query for every signal type; order_by() keeps the
+    # timestamp ordering out of the GROUP BY. price and confidence are NOT NULL,
+    # so a returned group never has a NULL aggregate
+    stats_by_type = {
+        row.pop('signal_type'): row
+        for row in strategy_signals(symbol, strategy_id).order_by().values('signal_type').annotate(
+            Count=Count('id'),
+            Avg_Price=Avg('price'),
+            Avg_Confidence=Avg('confidence'),
+            Min_Price=Min('price'),
+            Max_Price=Max('price')
+        )
+    }
+
+    rows = []
+    for signal_type in ('BUY', 'SELL', 'HOLD'):
+        stats = stats_by_type.get(signal_type)
+        if stats is None:
+            if signal_type == 'HOLD':
+                continue  # HOLD is only listed when present
+            stats = EMPTY_SIGNAL_STATS
+        rows.append({'Signal_Type': signal_type, **stats})
+    return rows
+
+
+def build_strategy_export(symbol, strategy_id=None, backtest_id=None):
+    """Workbook of a symbol's signals, backtests, signal summary and strategy comparison; returns (file, filename)"""
+    signals = strategy_signals(symbol, strategy_id)
+
+    # Name of the filtered strategy for the filename, taken from rows the sheets read
+    strategy_label = None
+
+    # Create Excel workbook with multiple sheets
+    output = _export_file()
+
+    with _excel_writer(output) as writer:
+        # Sheet 1: Trading Signals
+        if signals.exists():
+            rows = signals.values_list(*EXPORT_SIGNAL_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+            signals_df = pd.DataFrame.from_records(rows, columns=EXPORT_SIGNAL_FIELDS)
+
+            indicators = _indicator_frame(signals_df.pop('indicators'), EXPORT_INDICATOR_COLUMNS)
+            signals_df = pd.concat([signals_df, indicators], axis=1)
+
+            # Convert timezone-aware datetimes to naive datetimes for Excel compatibility
+            for field in ('timestamp', 'created_at'):
+                signals_df[field] = pd.to_datetime(signals_df[field], utc=True).dt.tz_localize(None)
+            signals_df['price'] = signals_df['price'].astype(float)
+            signals_df['confidence'] = signals_df['confidence'].fillna(0.0).astype(float)
+
+            signals_df = signals_df.rename(columns=EXPORT_SIGNAL_COLUMNS)[
+                ['Timestamp', 'Symbol', 'Strategy', 'Signal_Type', 'Price', 'Confidence',
+                 *EXPORT_INDICATOR_COLUMNS.values(), 'Created_At']
+            ]
+            signals_df.to_excel(writer, sheet_name='Trading_Signals', index=False)
+            if strategy_id:
+                strategy_label = signals_df['Strategy'].iat[0]
+
+        # Sheet 2: Backtest Results
+        backtests_query = StrategyBacktest.objects.filter(symbol=symbol)
+        if strategy_id:
+            backtests_query = backtests_query.filter(strategy_id=strategy_id)
+        if backtest_id:
+            backtests_query = backtests_query.filter(id=backtest_id)
+
+        backtest_df = _backtest_results_frame(backtests_query.order_by('-created_at'))
+        if not backtest_df.empty:
+            backtest_df.drop(columns='Profit_Factor').to_excel(writer, sheet_name='Backtest_Results', index=False)
+            if strategy_id and strategy_label is None:
+                strategy_label = backtest_df['Strategy'].iat[0]
+
+        # Sheet 3: Signal Summary
+        summary_df = pd.DataFrame(signal_summary(symbol, strategy_id))
+        summary_df.to_excel(writer, sheet_name='Signal_Summary', index=False)
+
+        # Sheet 4: Strategy Performance Comparison (if multiple strategies)
+        if not strategy_id:
+            # Unless narrowed to one backtest, Sheet 2 already read every backtest for the symbol
+            if backtest_id:
+                backtest_df = _backtest_results_frame(StrategyBacktest.objects.filter(symbol=symbol))
+            if not backtest_df.empty:
+                performance_df = backtest_df[[
+                    'Strategy', 'Total_Return_%', 'Win_Rate_%', 'Total_Trades', 'Profit_Factor', 'Max_Drawdown_%'
+                ]].copy()
+                period = backtest_df['From_Date'].astype(str) + ' to ' + backtest_df['To_Date'].astype(str)
+                performance_df.insert(1, 'Period', period)
+                performance_df.to_excel(writer, sheet_name='Performance_Comparison', index=False)
+
+    output.seek(0)
+
+    # Generate filename
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if strategy_id and strategy_label is None:
+        # Neither sheet had rows for the strategy
+        strategy_label = TradingStrategy.objects.filter(id=strategy_id).values_list('name', flat=True).first()
+    strategy_name = f"_{strategy_label}" if strategy_label else ""
+
+    filename = f"Strategy_Data_{symbol}{strategy_name}_{timestamp}.xlsx"
+
+    return output, filename
+
+
+def build_backtest_export(backtest):
+    """Workbook with a backtest's overview and its trade signals; returns (file, filename)"""
+    # Get related signals
+    signals = TradingSignal.objects.filter(
+        symbol=backtest.symbol,
+        strategy=backtest.strategy,
+        timestamp__gte=backtest.from_date,
+        timestamp__lte=backtest.to_date
+    ).order_by('timestamp')
+
+    output = _export_file()
+
+    with _excel_writer(output) as writer:
+        # Sheet 1: Backtest Overview
+        overview_data = [{
+            'Metric': 'Symbol',
+            'Value': backtest.symbol
+        }, {
+            'Metric': 'Strategy',
+            'Value': backtest.strategy.name
+        }, {
+            'Metric': 'Period',
+            'Value': f"{backtest.from_date} to {backtest.to_date}"
+        }, {
+            'Metric': 'Total Trades',
+            'Value': backtest.total_trades
+        }, {
+            'Metric': 'Winning Trades',
+            'Value': backtest.winning_trades
+        }, {
+            'Metric': 'Losing Trades',
+            'Value': backtest.losing_trades
+        }, {
+            'Metric': 'Win Rate (%)',
+            'Value': (backtest.winning_trades / backtest.total_trades * 100) if backtest.total_trades > 0 else 0
+        }, {
+            'Metric': 'Total Return (%)',
+            'Value': backtest.total_return
+        }, {
+            'Metric': 'Strategy Return (%)',
+            'Value': backtest.strategy_return
+        }, {
+            'Metric': 'Market Return (%)',
+            'Value': backtest.market_return
+        }, {
+            'Metric': 'Buy Signals Count',
+            'Value': backtest.buy_signals_count
+        }, {
+            'Metric': 'Sell Signals Count',
+            'Value': backtest.sell_signals_count
+        }]
+
+        overview_df = pd.DataFrame(overview_data)
+        overview_df.to_excel(writer, sheet_name='Backtest_Overview', index=False)
+
+        # Sheet 2: Trade Signals
+        if signals.exists():
+            signals_df = _trade_signals_frame(signals)
+            indicators = _indicator_frame(signals_df.pop('Indicators'), TRADE_INDICATOR_COLUMNS)
+            signals_df = pd.concat([signals_df, indicators], axis=1)
+
+            # Pair the n-th BUY with the n-th SELL and record the P/L on the sell row
+            buy_rows = signals_df.index[signals_df['Signal_Type'] == 'BUY']
+            sell_rows = signals_df.index[signals_df['Signal_Type'] == 'SELL']
+            pairs = min(len(buy_rows), len(sell_rows))
+            buy_prices = signals_df['Price'].loc[buy_rows[:pairs]].to_numpy()
+            profit_loss = signals_df['Price'].loc[sell_rows[:pairs]].to_numpy() - buy_prices
+            profit_loss_pct = pd.Series(profit_loss / buy_prices * 100).where(buy_prices > 0, 0).to_numpy()
+            for column, values in (('Profit_Loss', profit_loss), ('Profit_Loss_%', profit_loss_pct)):
+                # Blank ('') on every other row, so the column holds mixed values
+                column_values = pd.Series('', index=signals_df.index, dtype=object)
+                column_values.loc[sell_rows[:pairs]] = values
+                signals_df[column] = column_values
+
+            signals_df.to_excel(writer, sheet_name='Trade_Signals', index=False)
+
+    output.seek(0)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"Backtest_{backtest.symbol}_{backtest.strategy.name}_{timestamp}.xlsx"
+
+    return output, filename
@@ -0,0 +1,98 @@
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# EWM smoothing factors for the MACD spans (alpha = 2 / (span + 1))
+MACD_FAST_SPAN = 12
+MACD_SLOW_SPAN = 26
+MACD_SIGNAL_SPAN = 9
+MACD_FAST_ALPHA = 2.0 / (MACD_FAST_SPAN + 1)
+MACD_SLOW_ALPHA = 2.0 / (MACD_SLOW_SPAN + 1)
+MACD_SIGNAL_ALPHA = 2.0 / (MACD_SIGNAL_SPAN + 1)
+
+
+def _ewm_kernel(values, alpha):
+    """Recursive EWM (adjust=False) over a float64 array without NaNs"""
+    out = np.empty_like(values)
+    if values.size == 0:
+        return out
+    out[0] = values[0]
+    for i in range(1, values.size):
+        out[i] = alpha * values[i] + (1.0 - alpha) * out[i - 1]
+    return out
+
+
+def _moving_average_kernel(values, window):
+    """Rolling mean via a running window sum; NaN until the window is full"""
+    out = np.full(values.size, np.nan)
+    if values.size < window:
+        return out
+    total = 0.0
+    for i in range(window):
+        total += values[i]
+    out[window - 1] = total / window
+    for i in range(window, values.size):
+        total += values[i] - values[i - window]
+        out[i] = total / window
+    return out
+
+
+def _macd_kernel(close, fast_alpha, slow_alpha, signal_alpha):
+    """Fast/slow EMAs, MACD, signal and histogram fused into a single pass"""
+    n = close.size
+    macd_line = np.empty(n)
+    signal_line = np.empty(n)
+    histogram = np.empty(n)
+    if n == 0:
+        return macd_line, signal_line, histogram
+    fast = slow = close[0]
+    signal = 0.0
+    for i in range(n):
+        if i > 0:
+            fast = fast_alpha * close[i] + (1.0 - fast_alpha) * fast
+            slow = slow_alpha * close[i] + (1.0 - slow_alpha) * slow
+        value = fast - slow
+        signal = value if i == 0 else signal_alpha * value + (1.0 - signal_alpha) * signal
+        macd_line[i] = value
+        signal_line[i] = signal
+        histogram[i] = value - signal
+    return macd_line, signal_line, histogram
+
+
+if njit is not None:
+    _ewm_kernel = njit(cache=True)(_ewm_kernel)
+    _moving_average_kernel = njit(cache=True)(_moving_average_kernel)
+    _macd_kernel = njit(cache=True)(_macd_kernel)
+
+
+def ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponentially weighted mean matching pandas ewm(alpha=..., adjust=False)"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if njit is None and pd is not None:
+        # Without numba the pandas Cython path beats an interpreted loop
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return _ewm_kernel(values, alpha)
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average matching pandas rolling(window).mean()"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if njit is None and pd is not None:
+        return pd.Series(values).rolling(window).mean().to_numpy()
+    return _moving_average_kernel(values, window)
+
+
+def macd(close: np.ndarray):
+    """Calculate MACD line, signal line and histogram for close prices"""
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if njit is not None:
+        return _macd_kernel(close, MACD_FAST_ALPHA, MACD_SLOW_ALPHA, MACD_SIGNAL_ALPHA)
+    macd_line = ewm(close, MACD_FAST_ALPHA) - ewm(close, MACD_SLOW_ALPHA)
+    signal_line = ewm(macd_line, MACD_SIGNAL_ALPHA)
+    return macd_line, signal_line, macd_line - signal_line
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock_data', '0004_tradingstrategy_strategybacktest_tradingsignal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tradingsignal',
+            index=models.Index(fields=['timestamp', 'id'], name='stock_data__timesta_1657e1_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock_data', '0005_tradingsignal_timestamp_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tradingsignal',
+            index=models.Index(fields=['symbol', 'strategy', 'timestamp'], name='stock_data__symbol_ad66ef_idx'),
+        ),
+    ]
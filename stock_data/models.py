@@ -2,6 +2,7 @@ from django.db import models
 from django.utils import timezone
 import os
 from django.conf import settings
+from .cache import invalidate_api_credentials
 
 
 class StockSymbol(models.Model):
@@ -114,6 +115,15 @@ class APICredentials(models.Model):
             return False
         return timezone.now() < self.token_expires_at
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_api_credentials()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_api_credentials()
+        return result
+    
     def get_kite_login_url(self):
         """Get Kite Connect login URL"""
         try:
@@ -170,6 +180,8 @@ class TradingSignal(models.Model):
         indexes = [
             models.Index(fields=['symbol', 'timestamp']),
             models.Index(fields=['signal_type', 'timestamp']),
+            models.Index(fields=['timestamp', 'id']),  # Keyset pagination
+            models.Index(fields=['symbol', 'strategy', 'timestamp']),  # Exports filtered by strategy
         ]
 
 
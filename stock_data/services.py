@@ -1,4 +1,5 @@
 import json
+import mmap
 import os
 from datetime import datetime, timedelta
 from django.conf import settings
@@ -7,13 +8,36 @@ try:
     from kiteconnect import KiteConnect
 except ImportError:
     KiteConnect = None
+try:
+    from urllib3.util.retry import Retry
+except ImportError:
+    Retry = None
 import logging
+import heapq
+import threading
+from operator import itemgetter
 from typing import Dict, List, Any, Optional, Union
 import time
+from functools import lru_cache
+from .cache import cached
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
 try:
-    import pandas as pd
+    import ijson
 except ImportError:
-    pd = None
+    ijson = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +56,105 @@ KITE_LIMITS = {
 }
 
 
+# HTTP connection pool for the Kite clients; one session per API key is kept
+# alive across services so the TCP/TLS handshake is paid once per process
+KITE_POOL_SIZE = 4
+KITE_RETRY_STATUSES = [429, 502, 503, 504]
+
+# Historical data requests Kite accepts per second
+KITE_RATE_LIMIT = 3
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across every thread in the process"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.next_slot > now:
+                time.sleep(self.next_slot - now)
+                now = self.next_slot
+            self.next_slot = now + self.interval
+
+
+# Every historical_data call waits here, single fetches and chunked loops alike
+_kite_rate_limiter = _RateLimiter(KITE_RATE_LIMIT)
+
+
+# Width reserved in the JSON header for the file size, patched in after writing
+FILE_SIZE_FIELD_WIDTH = 16
+
+
+# Seconds to keep the data file listing cached between directory changes
+DATA_FILES_CACHE_TTL = 30
+
+
+def data_files_cache_key(kite_service) -> str:
+    """Cache key for the data file listing; changes whenever files are added or removed"""
+    mtime = os.stat(kite_service.data_dir).st_mtime_ns
+    return f"data_files:{kite_service.data_dir}:{mtime}"
+
+
+def get_parquet_path(json_path: str) -> str:
+    """Path of the columnar Parquet copy kept next to a JSON data file"""
+    return os.path.splitext(json_path)[0] + '.parquet'
+
+
+def get_index_path(json_path: str) -> str:
+    """Path of the record offset index kept next to a JSON data file"""
+    return os.path.splitext(json_path)[0] + '.idx.npy'
+
+
+def read_indexed_records(json_path: str, start: int, stop: int) -> Optional[List[Dict]]:
+    """Read records [start, stop) by byte range via the offset index; None if there is no index"""
+    index_path = get_index_path(json_path)
+    if np is None or not os.path.exists(index_path):
+        return None
+    
+    # offsets[i] is where record i starts; the last entry is where the final record ends
+    offsets = np.load(index_path, mmap_mode='r')
+    record_count = len(offsets) - 1
+    start, stop = min(start, record_count), min(stop, record_count)
+    if start >= stop:
+        return []
+    
+    with open(json_path, 'rb') as f:
+        f.seek(int(offsets[start]))
+        chunk = f.read(int(offsets[stop]) - int(offsets[start]))
+    chunk = b'[' + chunk.rstrip(b',\n') + b']'
+    return orjson.loads(chunk) if orjson is not None else json.loads(chunk)
+
+
+def read_metadata_header(file_path: str) -> Optional[Dict[str, Any]]:
+    """Read only the leading metadata object of a data file; None if ijson is unavailable"""
+    if ijson is None:
+        return None
+    with open(file_path, 'rb') as f:
+        return next(ijson.items(f, 'metadata', use_float=True), None)
+
+
+def load_json_file(file_path: str) -> Any:
+    """Parse a JSON file, via a read-only memory map and orjson when available"""
+    if orjson is None:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+
+def json_dumps_bytes(obj: Any) -> bytes:
+    """Serialize an object to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=str).encode('utf-8')
+
+
 def calculate_date_chunks(from_date, to_date, interval):
     """Calculate the number of chunks needed based on Kite limits"""
     # Get the limit for this interval
@@ -68,6 +191,13 @@ def get_kite_limit_info(interval: str) -> Dict[str, Any]:
 
 def estimate_api_calls(from_date, to_date, interval: str) -> Dict[str, Any]:
     """Estimate the number of API calls needed for a date range and interval"""
+    # Copied so callers can't modify the cached entry
+    return dict(_estimate_api_calls(from_date, to_date, interval))
+
+
+@lru_cache(maxsize=512)
+def _estimate_api_calls(from_date, to_date, interval: str) -> Dict[str, Any]:
+    """Chunk estimate for one (from_date, to_date, interval) combination, memoized"""
     total_days = (to_date - from_date).days
     limit_days = KITE_LIMITS.get(interval, 60)
     
@@ -86,6 +216,19 @@ def estimate_api_calls(from_date, to_date, interval: str) -> Dict[str, Any]:
     }
 
 
+def _merge_date_chunks(chunk_lists):
+    """Merge chunks that are each in date order into one date-ordered list, keeping the first record per date"""
+    # A linear merge replaces re-sorting everything; duplicates from shared
+    # chunk boundaries end up adjacent, so only the previous date is checked
+    merged = []
+    last_date = None
+    for record in heapq.merge(*chunk_lists, key=itemgetter('date')):
+        if record['date'] != last_date:
+            merged.append(record)
+            last_date = record['date']
+    return merged
+
+
 def fetch_and_combine_data(kite_service, symbol, from_date, to_date, interval):
     """Fetch data in chunks and combine them"""
     # Import the trading symbols from forms
@@ -103,7 +246,7 @@ def fetch_and_combine_data(kite_service, symbol, from_date, to_date, interval):
     
     logger.info(f"Fetching data for {symbol} in {len(date_chunks)} chunks due to Kite limits")
     
-    all_data = []
+    chunk_lists = []
     successful_chunks = 0
     
     for i, (chunk_start, chunk_end) in enumerate(date_chunks, 1):
@@ -119,7 +262,7 @@ def fetch_and_combine_data(kite_service, symbol, from_date, to_date, interval):
             )
             
             if chunk_data:
-                all_data.extend(chunk_data)
+                chunk_lists.append(chunk_data)
                 successful_chunks += 1
                 logger.info(f"Successfully fetched {len(chunk_data)} records for chunk {i}")
             else:
@@ -129,48 +272,58 @@ def fetch_and_combine_data(kite_service, symbol, from_date, to_date, interval):
             logger.error(f"Error fetching chunk {i} ({chunk_start} to {chunk_end}): {str(e)}")
             # Continue with other chunks even if one fails
             continue
-        
-        # Add delay between chunks to respect API rate limits
-        time.sleep(1)
     
-    if not all_data:
+    if not chunk_lists:
         raise Exception("No data could be fetched from any chunks")
     
-    # Remove duplicates and sort by date
-    if all_data:
-        # Convert to DataFrame for easier manipulation if pandas available
-        if pd is not None:
-            df = pd.DataFrame(all_data)
-            
-            # Remove duplicates based on date/timestamp
-            if 'date' in df.columns:
-                df = df.drop_duplicates(subset=['date']).sort_values('date')
-            elif 'timestamp' in df.columns:
-                df = df.drop_duplicates(subset=['timestamp']).sort_values('timestamp')
-            
-            # Convert back to list of dictionaries
-            all_data = df.to_dict('records')
-        else:
-            # Fallback deduplication without pandas
-            seen_dates = set()
-            deduplicated_data = []
-            for record in all_data:
-                date_key = record.get('date') or record.get('timestamp')
-                if date_key not in seen_dates:
-                    seen_dates.add(date_key)
-                    deduplicated_data.append(record)
-            
-            # Sort by date
-            all_data = sorted(deduplicated_data, key=lambda x: x.get('date') or x.get('timestamp', ''))
+    all_data = _merge_date_chunks(chunk_lists)
     
     logger.info(f"Combined data: {len(all_data)} total records from {successful_chunks}/{len(date_chunks)} successful chunks")
     return all_data
 
 
+def _kite_pool_config() -> Dict[str, Any]:
+    """HTTPAdapter settings for the Kite session, retrying rate-limited calls"""
+    pool = {
+        'pool_connections': KITE_POOL_SIZE,
+        'pool_maxsize': KITE_POOL_SIZE,
+    }
+    if Retry is not None:
+        pool['max_retries'] = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=KITE_RETRY_STATUSES,
+            allowed_methods=['GET'],
+            raise_on_status=False
+        )
+    return pool
+
+
+@lru_cache(maxsize=8)
+def _get_kite_session(api_key: str):
+    """Pooled requests session shared by every Kite client for an API key"""
+    return KiteConnect(api_key=api_key, pool=_kite_pool_config()).reqsession
+
+
 class KiteDataService:
     """Service class for handling Zerodha Kite API operations and JSON storage"""
     
     def __init__(self, api_credentials=None):
+        self.api_key = None
+        self.kite = None
+        self.session_data = None
+        self.bind_credentials(api_credentials)
+        
+        # Create data storage directory
+        self.data_dir = os.path.join(settings.BASE_DIR, 'data_storage')
+        os.makedirs(self.data_dir, exist_ok=True)
+        
+    def bind_credentials(self, api_credentials=None):
+        """Attach API credentials, dropping the Kite client if the API key changed"""
+        api_key = api_credentials.api_key if api_credentials else None
+        if api_key != self.api_key:
+            self.kite = None
+        
         if api_credentials:
             self.api_key = api_credentials.api_key
             self.api_secret = api_credentials.api_secret
@@ -184,13 +337,6 @@ class KiteDataService:
             self.refresh_token = None
             self.credentials = None
         
-        self.kite = None
-        self.session_data = None
-        
-        # Create data storage directory
-        self.data_dir = os.path.join(settings.BASE_DIR, 'data_storage')
-        os.makedirs(self.data_dir, exist_ok=True)
-        
     def get_json_filename(self, symbol: str, from_date: str, to_date: str, interval: str) -> str:
         """Generate filename for JSON data storage"""
         return f"{symbol}_{from_date}_{to_date}_{interval}.json"
@@ -228,8 +374,7 @@ class KiteDataService:
         
         if os.path.exists(filepath):
             try:
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
+                data = load_json_file(filepath)
                 logger.info(f"Loaded {data.get('total_records', 0)} records from {filepath}")
                 return data
             except Exception as e:
@@ -237,6 +382,7 @@ class KiteDataService:
                 return None
         return None
     
+    @cached(DATA_FILES_CACHE_TTL, data_files_cache_key)
     def list_available_data_files(self) -> List[Dict]:
         """List all available JSON data files with metadata"""
         files = []
@@ -248,11 +394,12 @@ class KiteDataService:
             if filename.endswith('.json'):
                 filepath = os.path.join(self.data_dir, filename)
                 try:
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                    
-                    # Extract metadata from the file
-                    metadata = data.get('metadata', {})
+                    # The header carries the record count; parse the whole file only if it does not
+                    metadata = read_metadata_header(filepath)
+                    if metadata is None or 'records_count' not in metadata:
+                        data = load_json_file(filepath)
+                        metadata = data.get('metadata', {})
+                        metadata.setdefault('records_count', len(data.get('data', [])))
                     
                     # Extract file info from metadata
                     file_info = {
@@ -262,7 +409,7 @@ class KiteDataService:
                         'from_date': metadata.get('from_date'),
                         'to_date': metadata.get('to_date'),
                         'interval': metadata.get('interval'),
-                        'total_records': metadata.get('records_count', len(data.get('data', []))),
+                        'total_records': metadata['records_count'],
                         'fetched_at': metadata.get('generated_at'),
                         'file_size': os.path.getsize(filepath)
                     }
@@ -273,6 +420,19 @@ class KiteDataService:
         # Sort by fetched_at descending (handle None values)
         files.sort(key=lambda x: x.get('fetched_at') or '1900-01-01T00:00:00', reverse=True)
         return files
+    
+    @cached(DATA_FILES_CACHE_TTL, lambda self: f"{data_files_cache_key(self)}:by_name")
+    def data_files_by_name(self) -> Dict[str, Dict]:
+        """Available data files keyed by filename"""
+        return {file_info['filename']: file_info for file_info in self.list_available_data_files()}
+    
+    @cached(DATA_FILES_CACHE_TTL, lambda self: f"{data_files_cache_key(self)}:by_symbol")
+    def data_files_by_symbol(self) -> Dict[str, List[Dict]]:
+        """Available data files grouped by symbol, newest first"""
+        files_by_symbol = {}
+        for file_info in self.list_available_data_files():
+            files_by_symbol.setdefault(file_info['symbol'], []).append(file_info)
+        return files_by_symbol
         
     def initialize_kite(self):
         """Initialize KiteConnect instance"""
@@ -284,14 +444,19 @@ class KiteDataService:
             logger.error("API key not provided")
             return False
             
-        try:
-            self.kite = KiteConnect(api_key=self.api_key)
-            if self.access_token:
-                self.kite.set_access_token(self.access_token)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to initialize KiteConnect: {str(e)}")
-            return False
+        if self.kite is None:
+            try:
+                # A client per service keeps the access token private to it; the
+                # pooled HTTP session underneath is shared per API key
+                self.kite = KiteConnect(api_key=self.api_key)
+                self.kite.reqsession = _get_kite_session(self.api_key)
+            except Exception as e:
+                logger.error(f"Failed to initialize KiteConnect: {str(e)}")
+                return False
+        
+        if self.access_token:
+            self.kite.set_access_token(self.access_token)
+        return True
     
     def get_login_url(self) -> str:
         """Get the login URL for Kite authentication"""
@@ -707,6 +872,7 @@ class KiteDataService:
                        f"From: {from_date_str}, To: {to_date_str}, Interval: {interval}")
             
             # Fetch data from Kite API
+            _kite_rate_limiter.wait()
             data = self.kite.historical_data(
                 instrument_token=instrument_token,
                 from_date=from_date_str,
@@ -768,7 +934,7 @@ class KiteDataService:
         logger.info(f"Starting batch fetch from {from_date.date()} to {to_date.date()} "
                    f"with {len(date_chunks)} chunks for {interval} interval")
         
-        all_data = []
+        chunk_lists = []
         successful_chunks = 0
         
         for i, (chunk_start, chunk_end) in enumerate(date_chunks, 1):
@@ -780,14 +946,9 @@ class KiteDataService:
                 )
                 
                 if batch_data:
-                    # Filter out any duplicate records (by date/timestamp)
-                    existing_dates = {record.get('date') for record in all_data}
-                    new_records = [record for record in batch_data 
-                                 if record.get('date') not in existing_dates]
-                    
-                    all_data.extend(new_records)
+                    chunk_lists.append(batch_data)
                     successful_chunks += 1
-                    logger.info(f"Chunk {i}: Added {len(new_records)} new records, total: {len(all_data)}")
+                    logger.info(f"Chunk {i}: Received {len(batch_data)} records")
                 else:
                     logger.warning(f"Chunk {i}: No data received")
                     
@@ -795,19 +956,13 @@ class KiteDataService:
                 logger.error(f"Error fetching chunk {i} ({chunk_start.date()} to {chunk_end.date()}): {str(e)}")
                 # Continue with next chunk instead of failing completely
                 continue
-            
-            # Add delay to respect API rate limits (Zerodha allows 3 requests per second)
-            time.sleep(1)  # 1 second delay between batches for safety
         
-        if not all_data:
+        if not chunk_lists:
             logger.error("No data could be fetched from any chunks")
             return []
         
+        all_data = _merge_date_chunks(chunk_lists)
         logger.info(f"Batch fetching completed. Total records: {len(all_data)} from {successful_chunks}/{len(date_chunks)} successful chunks")
-        
-        # Sort data by date to ensure chronological order
-        all_data.sort(key=lambda x: x.get('date', ''))
-        
         return all_data
     
     def save_data_to_json(
@@ -856,26 +1011,56 @@ class KiteDataService:
                 'to_date': to_date_obj.isoformat() if hasattr(to_date_obj, 'isoformat') else to_date,
                 'records_count': len(data),
                 'generated_at': datetime.now().isoformat(),
-                'file_size_mb': 0  # Will be calculated after saving
             }
             
-            # Prepare final data structure
-            final_data = {
-                'metadata': metadata,
-                'data': data
-            }
-            
-            # Save to JSON file
-            with open(file_path, 'w') as f:
-                json.dump(final_data, f, indent=2, default=str)
+            # Stream the file: metadata header first, then one record per line.
+            # Peak memory is a single serialized record instead of the whole file.
+            with open(file_path, 'wb') as f:
+                f.write(b'{"metadata": ')
+                f.write(json_dumps_bytes(metadata)[:-1])
+                f.write(b', "file_size_mb": ')
+                # Reserve space for the file size; it is only known after writing
+                size_offset = f.tell()
+                f.write(b' ' * FILE_SIZE_FIELD_WIDTH)
+                f.write(b'},\n"data": [')
+                
+                # Track each record's byte offset for the pagination index
+                position = f.tell()
+                offsets = []
+                separator = b'\n'
+                for record in data:
+                    record_bytes = json_dumps_bytes(record)
+                    f.write(separator)
+                    position += len(separator)
+                    offsets.append(position)
+                    f.write(record_bytes)
+                    position += len(record_bytes)
+                    separator = b',\n'
+                offsets.append(position)
+                f.write(b'\n]}\n')
+                
+                # Calculate file size and patch it into the reserved header slot
+                file_size = f.tell() / (1024 * 1024)  # MB
+                metadata['file_size_mb'] = round(file_size, 2)
+                f.seek(size_offset)
+                f.write(str(metadata['file_size_mb']).ljust(FILE_SIZE_FIELD_WIDTH).encode('ascii'))
             
-            # Calculate file size
-            file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-            metadata['file_size_mb'] = round(file_size, 2)
+            # Record offsets let data_view read a single page by byte range
+            index_path = get_index_path(file_path)
+            if np is not None:
+                np.save(index_path, np.asarray(offsets, dtype=np.int64))
+            elif os.path.exists(index_path):
+                os.remove(index_path)
             
-            # Update file with correct metadata
-            with open(file_path, 'w') as f:
-                json.dump(final_data, f, indent=2, default=str)
+            # Columnar copy for the chart and data views; the JSON file stays canonical
+            parquet_path = get_parquet_path(file_path)
+            if pq is not None and data:
+                try:
+                    pq.write_table(pa.Table.from_pylist(data), parquet_path)
+                except Exception as e:
+                    logger.warning(f"Could not write Parquet copy of {file_path}: {str(e)}")
+            elif os.path.exists(parquet_path):
+                os.remove(parquet_path)
             
             logger.info(f"Data saved to {file_path}")
             return file_path
@@ -1006,24 +1191,28 @@ class KiteDataService:
         if not data:
             return {}
         
-        if pd is not None:
-            # Use pandas for efficient calculations
-            df = pd.DataFrame(data)
+        if np is not None:
+            # Reduce directly over typed arrays - no DataFrame construction needed
+            count = len(data)
+            highs = np.fromiter((record['high'] for record in data), dtype=np.float64, count=count)
+            lows = np.fromiter((record['low'] for record in data), dtype=np.float64, count=count)
+            closes = np.fromiter((record['close'] for record in data), dtype=np.float64, count=count)
+            volumes = np.fromiter((record['volume'] for record in data), dtype=np.int64, count=count)
             stats = {
-                'total_records': len(data),
+                'total_records': count,
                 'date_range': {
                     'start': data[0]['date'],
                     'end': data[-1]['date']
                 },
                 'price_stats': {
-                    'max_high': float(df['high'].max()),
-                    'min_low': float(df['low'].min()),
-                    'avg_close': float(df['close'].mean()),
-                    'total_volume': int(df['volume'].sum())
+                    'max_high': float(highs.max()),
+                    'min_low': float(lows.min()),
+                    'avg_close': float(closes.mean()),
+                    'total_volume': int(volumes.sum())
                 }
             }
         else:
-            # Fallback calculations without pandas
+            # Fallback calculations without numpy
             highs = [float(record['high']) for record in data]
             lows = [float(record['low']) for record in data]
             closes = [float(record['close']) for record in data]
@@ -1046,6 +1235,17 @@ class KiteDataService:
         return stats
 
 
+@lru_cache(maxsize=1)
+def get_default_kite_service() -> KiteDataService:
+    """Process-wide KiteDataService without credentials, for listing and reading stored files"""
+    return KiteDataService()
+
+
+def get_kite_service_for(credentials) -> KiteDataService:
+    """New KiteDataService bound to a credentials row; nothing mutable is shared between callers"""
+    return KiteDataService(credentials)
+
+
 class KiteAuthService:
     """Service for handling Kite authentication flow"""
     
@@ -1063,7 +1263,7 @@ class KiteAuthService:
         """Create KiteDataService with active credentials"""
         credentials = KiteAuthService.get_active_credentials()
         if credentials:
-            return KiteDataService(api_credentials=credentials)
+            return get_kite_service_for(credentials)
         return None
     
     @staticmethod
@@ -1,13 +1,24 @@
 import pandas as pd
 import numpy as np
-import json
+import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
+from django.db import transaction
 from .models import TradingSignal, TradingStrategy, StrategyBacktest
+from .indicators import macd
+from .cache import invalidate_signal_symbols
+from .services import get_parquet_path, load_json_file
 import logging
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT when saving generated signals
+SIGNAL_BATCH_SIZE = 500
+
 
 class TradingStrategyService:
     """Service to implement and execute trading strategies"""
@@ -18,25 +29,30 @@ class TradingStrategyService:
     def load_data_from_json(self, file_path: str) -> pd.DataFrame:
         """Load stock data from JSON file and convert to DataFrame"""
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            
-            # Extract data records
-            records = data.get('data', [])
-            if not records:
-                raise ValueError("No data records found in JSON file")
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(records)
+            parquet_path = get_parquet_path(file_path)
+            if pq is not None and os.path.exists(parquet_path):
+                # Columnar copy saved next to the JSON file; skips JSON parsing entirely
+                df = pd.read_parquet(parquet_path)
+                if df.empty:
+                    raise ValueError("No data records found in Parquet file")
+            else:
+                data = load_json_file(file_path)
+                
+                # Extract data records
+                records = data.get('data', [])
+                if not records:
+                    raise ValueError("No data records found in JSON file")
+                
+                # Convert to DataFrame
+                df = pd.DataFrame(records)
             
             # Convert date column to datetime and set as index
             df['date'] = pd.to_datetime(df['date'])
             df = df.set_index('date')
             
-            # Ensure numeric columns
+            # Ensure numeric columns (single block conversion)
             numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-            for col in numeric_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
             
             return df
             
@@ -82,20 +98,20 @@ class TradingStrategyService:
             logger.error(f"Error resampling data: {str(e)}")
             raise
     
-    def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate technical indicators"""
+    def calculate_indicators(self, df: pd.DataFrame, copy: bool = False) -> pd.DataFrame:
+        """Calculate technical indicators (adds columns in place unless copy=True)"""
         try:
-            df = df.copy()
+            if copy:
+                df = df.copy()
             
             # Moving Averages
             df["MA_5"] = df["close"].rolling(window=5).mean()
             
-            # MACD
-            exp12 = df["close"].ewm(span=12, adjust=False).mean()
-            exp26 = df["close"].ewm(span=26, adjust=False).mean()
-            df["MACD"] = exp12 - exp26
-            df["MACD_Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-            df["MACD_Histogram"] = df["MACD"] - df["MACD_Signal"]
+            # MACD (12/26 EMA with 9 period signal line)
+            macd_line, signal_line, histogram = macd(df["close"].to_numpy())
+            df["MACD"] = macd_line
+            df["MACD_Signal"] = signal_line
+            df["MACD_Histogram"] = histogram
             
             return df
             
@@ -103,11 +119,14 @@ class TradingStrategyService:
             logger.error(f"Error calculating indicators: {str(e)}")
             raise
     
-    def implement_strategy(self, df_15m: pd.DataFrame, df_1h: pd.DataFrame, df_1d: pd.DataFrame) -> pd.DataFrame:
-        """Implement the MACD MA CrossOver strategy"""
+    def implement_strategy(self, df_15m: pd.DataFrame, df_1h: pd.DataFrame, df_1d: pd.DataFrame,
+                           copy: bool = False) -> pd.DataFrame:
+        """Implement the MACD MA CrossOver strategy (adds signal columns to df_15m unless copy=True)"""
         try:
+            if copy:
+                df_15m = df_15m.copy()
+            
             # Initialize signals
-            df_15m = df_15m.copy()
             df_15m["Signal"] = 0
             df_15m["Signal_Type"] = ""
             df_15m["Signal_Price"] = 0.0
@@ -115,14 +134,17 @@ class TradingStrategyService:
             
             in_trade = False
             
+            # Find the most recent 1H and 1D candle for every 15m bar with a
+            # single binary search rather than masking the whole frame per bar
+            times_15m = df_15m.index.values
+            h1_idx = np.searchsorted(df_1h.index.values, times_15m, side="right") - 1
+            d1_idx = np.searchsorted(df_1d.index.values, times_15m, side="right") - 1
+            h1_green = df_1h["close"].values > df_1h["open"].values
+            d1_green = df_1d["close"].values > df_1d["open"].values
+            
             for i in range(5, len(df_15m)):
-                current_15m_time = df_15m.index[i]
-                
-                # Find the most recent 1H and 1D candles
-                try:
-                    current_1h_candle = df_1h[df_1h.index <= current_15m_time].iloc[-1]
-                    current_1d_candle = df_1d[df_1d.index <= current_15m_time].iloc[-1]
-                except (IndexError, KeyError):
+                # Skip bars that precede the first 1H or 1D candle
+                if h1_idx[i] < 0 or d1_idx[i] < 0:
                     continue
                 
                 # Buy conditions
@@ -130,8 +152,8 @@ class TradingStrategyService:
                     ma_cross_up = df_15m["MA_5"].iloc[i] > df_15m["close"].iloc[i - 1]
                     all_green = (
                         df_15m["close"].iloc[i] > df_15m["open"].iloc[i]
-                        and current_1h_candle["close"] > current_1h_candle["open"]
-                        and current_1d_candle["close"] > current_1d_candle["open"]
+                        and h1_green[h1_idx[i]]
+                        and d1_green[d1_idx[i]]
                     )
                     
                     if ma_cross_up and all_green:
@@ -168,9 +190,13 @@ class TradingStrategyService:
             # Market returns
             df["Returns"] = df["close"].pct_change()
             
-            # Extract buy & sell prices
-            buys = df.loc[df["Signal"] == 1, "close"].reset_index(drop=True)
-            sells = df.loc[df["Signal"] == -1, "close"].reset_index(drop=True)
+            # Locate buy & sell rows once on the raw arrays
+            signal_values = df["Signal"].values
+            close_values = df["close"].values
+            buy_positions = np.flatnonzero(signal_values == 1)
+            sell_positions = np.flatnonzero(signal_values == -1)
+            buys = close_values[buy_positions]
+            sells = close_values[sell_positions]
             
             # Align lengths (ignore incomplete last trade)
             n = min(len(buys), len(sells))
@@ -188,12 +214,12 @@ class TradingStrategyService:
                     "win_rate": 0.0
                 }
             
-            profits = sells.iloc[:n].values - buys.iloc[:n].values
-            trade_returns = profits / buys.iloc[:n].values
+            profits = sells[:n] - buys[:n]
+            trade_returns = profits / buys[:n]
             
             # Build a trade return series aligned with sell signals
-            strategy_returns = pd.Series(0, index=df.index, dtype=float)
-            strategy_returns.loc[df.loc[df["Signal"] == -1].index[:n]] = trade_returns
+            strategy_returns = np.zeros(len(df), dtype=float)
+            strategy_returns[sell_positions[:n]] = trade_returns
             
             # Add to df
             df["Strategy_Returns"] = strategy_returns
@@ -201,8 +227,8 @@ class TradingStrategyService:
             df["Cumulative_Strategy"] = (1 + df["Strategy_Returns"].fillna(0)).cumprod()
             
             # Calculate performance metrics
-            winning_trades = len([p for p in profits if p > 0])
-            losing_trades = len([p for p in profits if p <= 0])
+            winning_trades = int((profits > 0).sum())
+            losing_trades = int((profits <= 0).sum())
             
             market_return = (df["Cumulative_Market"].iloc[-1] - 1) * 100
             strategy_return = (df["Cumulative_Strategy"].iloc[-1] - 1) * 100
@@ -214,8 +240,8 @@ class TradingStrategyService:
                 "total_return": strategy_return,
                 "market_return": market_return,
                 "strategy_return": strategy_return,
-                "buy_signals": len(df[df["Signal"] == 1]),
-                "sell_signals": len(df[df["Signal"] == -1]),
+                "buy_signals": len(buy_positions),
+                "sell_signals": len(sell_positions),
                 "win_rate": (winning_trades / n * 100) if n > 0 else 0.0
             }
             
@@ -240,35 +266,38 @@ class TradingStrategyService:
                 }
             )
             
-            # Clear existing signals for this symbol and strategy
-            TradingSignal.objects.filter(symbol=symbol, strategy=strategy).delete()
-            
-            # Save new signals
-            signals_created = 0
-            for index, row in df.iterrows():
-                if row["Signal"] != 0:  # Only save actual signals
-                    # Ensure all indicator values are JSON serializable
-                    indicators_data = {
-                        'MA_5': float(row.get("MA_5", 0)) if pd.notna(row.get("MA_5", 0)) else 0.0,
-                        'MACD': float(row.get("MACD", 0)) if pd.notna(row.get("MACD", 0)) else 0.0,
-                        'MACD_Signal': float(row.get("MACD_Signal", 0)) if pd.notna(row.get("MACD_Signal", 0)) else 0.0,
-                        'MACD_Histogram': float(row.get("MACD_Histogram", 0)) if pd.notna(row.get("MACD_Histogram", 0)) else 0.0,
-                        'close': float(row["close"]) if pd.notna(row["close"]) else 0.0,
-                        'volume': int(row["volume"]) if pd.notna(row["volume"]) else 0,
-                        'timestamp': index.isoformat() if hasattr(index, 'isoformat') else str(index)
-                    }
-                    
-                    signal = TradingSignal(
-                        symbol=symbol,
-                        strategy=strategy,
-                        signal_type=row["Signal_Type"],
-                        timestamp=index,
-                        price=float(row["Signal_Price"]) if pd.notna(row["Signal_Price"]) else 0.0,
-                        confidence=float(row["Signal_Confidence"]) if pd.notna(row["Signal_Confidence"]) else 0.0,
-                        indicators=indicators_data
-                    )
-                    signal.save()
-                    signals_created += 1
+            # Build the new signals in memory, then insert them in batches
+            signals = []
+            for index, row in df[df["Signal"] != 0].iterrows():  # Only save actual signals
+                # Ensure all indicator values are JSON serializable
+                indicators_data = {
+                    'MA_5': float(row.get("MA_5", 0)) if pd.notna(row.get("MA_5", 0)) else 0.0,
+                    'MACD': float(row.get("MACD", 0)) if pd.notna(row.get("MACD", 0)) else 0.0,
+                    'MACD_Signal': float(row.get("MACD_Signal", 0)) if pd.notna(row.get("MACD_Signal", 0)) else 0.0,
+                    'MACD_Histogram': float(row.get("MACD_Histogram", 0)) if pd.notna(row.get("MACD_Histogram", 0)) else 0.0,
+                    'close': float(row["close"]) if pd.notna(row["close"]) else 0.0,
+                    'volume': int(row["volume"]) if pd.notna(row["volume"]) else 0,
+                    'timestamp': index.isoformat() if hasattr(index, 'isoformat') else str(index)
+                }
+                
+                signals.append(TradingSignal(
+                    symbol=symbol,
+                    strategy=strategy,
+                    signal_type=row["Signal_Type"],
+                    timestamp=index,
+                    price=float(row["Signal_Price"]) if pd.notna(row["Signal_Price"]) else 0.0,
+                    confidence=float(row["Signal_Confidence"]) if pd.notna(row["Signal_Confidence"]) else 0.0,
+                    indicators=indicators_data
+                ))
+            
+            # Replace existing signals for this symbol and strategy atomically
+            with transaction.atomic():
+                TradingSignal.objects.filter(symbol=symbol, strategy=strategy).delete()
+                TradingSignal.objects.bulk_create(signals, batch_size=SIGNAL_BATCH_SIZE)
+            signals_created = len(signals)
+            
+            # The signals page symbol filter depends on these rows
+            invalidate_signal_symbols()
             
             logger.info(f"Saved {signals_created} signals for {symbol}")
             return signals_created
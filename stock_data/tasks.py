@@ -0,0 +1,167 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+try:
+    from celery import shared_task
+    from celery.result import AsyncResult
+except ImportError:
+    shared_task = None
+    AsyncResult = None
+from .cache import cache_is_shared, get_api_credentials, store_export
+from .chart_service import cache_chart_payload
+from .export_service import build_backtest_export, build_strategy_export
+from .models import StrategyBacktest
+from .services import KITE_RATE_LIMIT, get_kite_service_for
+from .strategy_service import TradingStrategyService
+
+logger = logging.getLogger(__name__)
+
+# Symbols fetched in parallel by a batch request. Kite calls from every thread
+# share one limiter in services, so the batch stays within KITE_RATE_LIMIT
+BATCH_FETCH_WORKERS = KITE_RATE_LIMIT
+
+
+def celery_enabled() -> bool:
+    """Check whether Celery is installed, a broker is configured and the cache is shared with workers"""
+    if shared_task is None or not getattr(settings, 'CELERY_BROKER_URL', None):
+        return False
+    if not cache_is_shared():
+        # Worker-side cache writes and invalidations would never reach the web process
+        _warn_process_local_cache()
+        return False
+    return True
+
+
+@lru_cache(maxsize=1)
+def _warn_process_local_cache():
+    logger.warning(
+        "CELERY_BROKER_URL is set but the default cache is process-local; running tasks "
+        "synchronously. Configure a shared cache such as Redis to enable Celery"
+    )
+
+
+def run_strategy(file_path, symbol):
+    """Run the trading strategy on a data file"""
+    result = TradingStrategyService().run_strategy_on_file(file_path, symbol)
+    if result.get('success') and celery_enabled():
+        # Build the chart while the user is still reading the results
+        precompute_chart_payload.delay(result['backtest_id'])
+    return result
+
+
+def precompute_chart_payload(backtest_id):
+    """Store a backtest's chart payload in the cache ahead of the first chart request"""
+    backtest = StrategyBacktest.objects.select_related('strategy').get(id=backtest_id)
+    cache_chart_payload(backtest)
+
+
+def fetch_stock_data(symbol, from_date, to_date, interval):
+    """Fetch historical data with the stored credentials and save it to JSON"""
+    kite_service = get_kite_service_for(get_api_credentials())
+    return _fetch_and_save(kite_service, symbol, from_date, to_date, interval)
+
+
+def _fetch_and_save(kite_service, symbol, from_date, to_date, interval):
+    """Fetch historical data with an already bound service and save it to JSON"""
+    # Check if data already exists
+    existing_data = kite_service.load_data_from_json(symbol, from_date, to_date, interval)
+    if existing_data:
+        return {
+            'success': True,
+            'message': f'Data already exists with {existing_data["total_records"]} records',
+            'data_count': existing_data['total_records'],
+            'file_exists': True
+        }
+    
+    # Fetch new data using smart fetching (automatically handles chunking)
+    historical_data = kite_service.fetch_historical_data_smart(
+        symbol=symbol,
+        from_date=from_date,
+        to_date=to_date,
+        interval=interval
+    )
+    
+    # Save to JSON file
+    filepath = kite_service.save_data_to_json(historical_data, symbol, from_date, to_date, interval)
+    
+    return {
+        'success': True,
+        'message': f'Fetched {len(historical_data)} records and saved to JSON file',
+        'data_count': len(historical_data),
+        'filename': os.path.basename(filepath),
+        'filepath': filepath
+    }
+
+
+def _stored_export(output, filename):
+    """Hand a built workbook to the download view"""
+    with output:
+        token = store_export(filename, output.read())
+    return {
+        'success': True,
+        'filename': filename,
+        'download_url': reverse('download_export', args=[token])
+    }
+
+
+def export_strategy_data(symbol, strategy_id=None, backtest_id=None):
+    """Build the strategy data workbook and store it for download"""
+    output, filename = build_strategy_export(symbol, strategy_id, backtest_id)
+    return _stored_export(output, filename)
+
+
+def export_backtest(backtest_id):
+    """Build a backtest's workbook and store it for download"""
+    backtest = StrategyBacktest.objects.select_related('strategy').get(id=backtest_id)
+    output, filename = build_backtest_export(backtest)
+    return _stored_export(output, filename)
+
+
+if shared_task is not None:
+    run_strategy = shared_task(run_strategy)
+    precompute_chart_payload = shared_task(precompute_chart_payload)
+    fetch_stock_data = shared_task(fetch_stock_data)
+    export_strategy_data = shared_task(export_strategy_data)
+    export_backtest = shared_task(export_backtest)
+
+
+def fetch_stock_data_batch(fetch_requests):
+    """Fetch several symbols concurrently, returning one result per request in order"""
+    # Bound once here: the service is shared by the worker threads
+    kite_service = get_kite_service_for(get_api_credentials())
+    
+    def fetch_one(fetch_request):
+        symbol = fetch_request['symbol'].upper()
+        try:
+            result = _fetch_and_save(
+                kite_service,
+                symbol,
+                fetch_request.get('from_date'),
+                fetch_request.get('to_date'),
+                fetch_request.get('interval', 'minute')
+            )
+        except Exception as e:
+            logger.error(f"Error fetching data for {symbol}: {e}", exc_info=True)
+            result = {'success': False, 'error': f'Error: {str(e)}'}
+        finally:
+            # Worker threads get their own DB connection; release it here
+            connection.close()
+        return {'symbol': symbol, **result}
+    
+    with ThreadPoolExecutor(max_workers=BATCH_FETCH_WORKERS) as executor:
+        return list(executor.map(fetch_one, fetch_requests))
+
+
+def get_task_status(task_id):
+    """State of a background task, with its result once it has finished"""
+    result = AsyncResult(task_id)
+    status = {'task_id': task_id, 'state': result.state}
+    if result.successful():
+        status['result'] = result.result
+    elif result.failed():
+        status['error'] = str(result.result)
+    return status
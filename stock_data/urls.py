@@ -13,11 +13,14 @@ urlpatterns = [
     
     # API endpoints
     path('fetch-data/', views.fetch_data_api, name='fetch_data_api'),
+    path('fetch-batch/', views.fetch_batch_api, name='fetch_batch_api'),
     path('execute-strategy/', views.execute_strategy, name='execute_strategy'),
+    path('task-status/<str:task_id>/', views.task_status, name='task_status'),
     path('test-connection/', views.test_connection, name='test_connection'),
     path('api/chart-data/<int:backtest_id>/', views.chart_data_api, name='chart_data_api'),
     
     # Export endpoints
     path('export/strategy-data/', views.export_strategy_data_to_excel, name='export_strategy_data'),
     path('export/backtest/<int:backtest_id>/', views.export_backtest_to_excel, name='export_backtest'),
+    path('export/download/<str:token>/', views.download_export, name='download_export'),
 ]
@@ -1,25 +1,54 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.urls import reverse
-from django.db.models import Avg, Min, Max, Count
+from django.db.models import Q
+from django.core.cache import cache
 from .models import APICredentials, TradingSignal, TradingStrategy, StrategyBacktest
 from .forms import APICredentialsForm, AuthenticationForm, StockDataFetchForm
-from .services import KiteDataService
-from .strategy_service import TradingStrategyService
+from .services import (
+    get_default_kite_service, get_kite_service_for, get_parquet_path,
+    json_dumps_bytes, load_json_file, read_indexed_records,
+)
+from .tasks import (
+    celery_enabled, export_backtest, export_strategy_data, fetch_stock_data, fetch_stock_data_batch,
+    get_task_status, run_strategy,
+)
+from .chart_service import build_chart_data, cache_chart_payload, chart_cache_key
+from .cache import get_api_credentials, get_export, get_signal_symbols
+from .export_service import (
+    XLSX_CONTENT_TYPE, build_backtest_export, build_strategy_export, signal_csv_lines, strategy_signals,
+)
 import json
 import logging
 from datetime import datetime, timedelta
+from itertools import islice
 import os
-import pandas as pd
 from io import BytesIO
+try:
+    import ijson
+except ImportError:
+    ijson = None
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
 logger = logging.getLogger(__name__)
 
+# Rows per page on the signals list
+SIGNALS_PAGE_SIZE = 50
+
+# Signal columns the list templates render; skips the indicators JSON and notes
+SIGNAL_LIST_FIELDS = ('symbol', 'signal_type', 'timestamp', 'price', 'confidence', 'strategy__name')
+
+# Lines per chunk when streaming chart data as NDJSON
+NDJSON_BATCH_SIZE = 1000
+
 def index(request):
     """Main dashboard view with data fetching form."""
-    credentials = APICredentials.objects.first()
+    credentials = get_api_credentials()
     fetch_form = StockDataFetchForm()
     
     # Handle form submission
@@ -53,7 +82,7 @@ def index(request):
             
             try:
                 # Fetch data using KiteDataService
-                kite_service = KiteDataService(api_credentials=credentials)
+                kite_service = get_kite_service_for(credentials)
                 
                 # Check if data already exists
                 existing_data = kite_service.load_data_from_json(symbol, from_date, to_date, interval)
@@ -83,7 +112,7 @@ def index(request):
                 messages.error(request, f'Error fetching data: {str(e)}')
     
     # Get available data files
-    kite_service = KiteDataService()
+    kite_service = get_default_kite_service()
     available_files = kite_service.list_available_data_files()
     
     context = {
@@ -97,7 +126,7 @@ def index(request):
 
 def settings(request):
     """API settings and authentication view."""
-    credentials = APICredentials.objects.first()
+    credentials = APICredentials.objects.first()  # Uncached: this view edits the row
     login_url = None
     
     if request.method == 'POST':
@@ -125,7 +154,7 @@ def settings(request):
                 logger.info(f"Processing authentication with request_token: {request_token[:10]}...")
                 
                 try:
-                    kite_service = KiteDataService(api_credentials=credentials)
+                    kite_service = get_kite_service_for(credentials)
                     logger.info("Attempting to generate session...")
                     session_data = kite_service.generate_session(request_token)
                     
@@ -179,7 +208,7 @@ def settings(request):
 
 def data_view(request):
     """Enhanced data view showing JSON file contents with pagination."""
-    kite_service = KiteDataService()
+    kite_service = get_default_kite_service()
     available_files = kite_service.list_available_data_files()
     
     # Get selected file from query params
@@ -189,54 +218,81 @@ def data_view(request):
     
     if selected_file:
         # Load data from selected JSON file
-        for file_info in available_files:
-            if file_info['filename'] == selected_file:
-                try:
-                    with open(file_info['filepath'], 'r') as f:
-                        file_data = json.load(f)
-                    
-                    # Pagination logic
-                    page = int(request.GET.get('page', 1))
-                    per_page = int(request.GET.get('per_page', 100))
-                    
+        file_info = kite_service.data_files_by_name().get(selected_file)
+        if file_info:
+            try:
+                # Pagination logic
+                page = max(int(request.GET.get('page', 1)), 1)
+                per_page = max(int(request.GET.get('per_page', 100)), 1)
+                
+                # Calculate pagination
+                start_idx = (page - 1) * per_page
+                end_idx = start_idx + per_page
+                
+                listed_metadata = {'metadata': {
+                    'symbol': file_info['symbol'],
+                    'from_date': file_info['from_date'],
+                    'to_date': file_info['to_date'],
+                    'interval': file_info['interval'],
+                    'generated_at': file_info['fetched_at'],
+                }}
+                parquet_path = get_parquet_path(file_info['filepath'])
+                indexed_data = read_indexed_records(file_info['filepath'], start_idx, end_idx)
+                if indexed_data is not None:
+                    # Offset index: read just this page's bytes from the JSON file
+                    paginated_data = indexed_data
+                    total_records = file_info['total_records']
+                    file_data = listed_metadata
+                elif pq is not None and os.path.exists(parquet_path):
+                    # Columnar copy: slice the page straight out of the Arrow table
+                    table = pq.read_table(parquet_path)
+                    paginated_data = table.slice(start_idx, per_page).to_pylist()
+                    total_records = table.num_rows
+                    file_data = listed_metadata
+                elif ijson is not None:
+                    # Stream only the requested page instead of parsing the whole file;
+                    # metadata is written as the first key so it is read almost immediately
+                    with open(file_info['filepath'], 'rb') as f:
+                        file_data = {'metadata': next(ijson.items(f, 'metadata'), {})}
+                        f.seek(0)
+                        records = ijson.items(f, 'data.item', use_float=True)
+                        paginated_data = list(islice(records, start_idx, end_idx))
+                    total_records = file_info['total_records']
+                else:
+                    file_data = load_json_file(file_info['filepath'])
                     all_data = file_data.get('data', [])
                     total_records = len(all_data)
-                    
-                    # Calculate pagination
-                    start_idx = (page - 1) * per_page
-                    end_idx = start_idx + per_page
                     paginated_data = all_data[start_idx:end_idx]
-                    
-                    total_pages = (total_records + per_page - 1) // per_page
-                    
-                    data_content = {
-                        'metadata': {
-                            'symbol': file_data.get('metadata', {}).get('symbol') or file_data.get('symbol'),
-                            'from_date': file_data.get('metadata', {}).get('from_date') or file_data.get('from_date'),
-                            'to_date': file_data.get('metadata', {}).get('to_date') or file_data.get('to_date'),
-                            'interval': file_data.get('metadata', {}).get('interval') or file_data.get('interval'),
-                            'total_records': total_records,
-                            'fetched_at': file_data.get('metadata', {}).get('generated_at') or file_data.get('fetched_at'),
-                        },
-                        'records': paginated_data
-                    }
-                    
-                    pagination_info = {
-                        'current_page': page,
-                        'total_pages': total_pages,
-                        'per_page': per_page,
+                
+                total_pages = (total_records + per_page - 1) // per_page
+                
+                data_content = {
+                    'metadata': {
+                        'symbol': file_data.get('metadata', {}).get('symbol') or file_data.get('symbol'),
+                        'from_date': file_data.get('metadata', {}).get('from_date') or file_data.get('from_date'),
+                        'to_date': file_data.get('metadata', {}).get('to_date') or file_data.get('to_date'),
+                        'interval': file_data.get('metadata', {}).get('interval') or file_data.get('interval'),
                         'total_records': total_records,
-                        'start_record': start_idx + 1,
-                        'end_record': min(end_idx, total_records),
-                        'has_previous': page > 1,
-                        'has_next': page < total_pages,
-                        'previous_page': page - 1 if page > 1 else None,
-                        'next_page': page + 1 if page < total_pages else None,
-                    }
-                    
-                except Exception as e:
-                    messages.error(request, f'Error loading file {selected_file}: {str(e)}')
-                break
+                        'fetched_at': file_data.get('metadata', {}).get('generated_at') or file_data.get('fetched_at'),
+                    },
+                    'records': paginated_data
+                }
+                
+                pagination_info = {
+                    'current_page': page,
+                    'total_pages': total_pages,
+                    'per_page': per_page,
+                    'total_records': total_records,
+                    'start_record': start_idx + 1,
+                    'end_record': min(end_idx, total_records),
+                    'has_previous': page > 1,
+                    'has_next': page < total_pages,
+                    'previous_page': page - 1 if page > 1 else None,
+                    'next_page': page + 1 if page < total_pages else None,
+                }
+                
+            except Exception as e:
+                messages.error(request, f'Error loading file {selected_file}: {str(e)}')
     
     context = {
         'available_files': available_files,
@@ -247,6 +303,22 @@ def data_view(request):
     
     return render(request, 'data.html', context)
 
+def _check_api_authentication():
+    """Return an error response if the stored API credentials cannot be used"""
+    # Check if credentials exist and are authenticated
+    credentials = get_api_credentials()
+    if not credentials or not credentials.is_authenticated:
+        return JsonResponse({
+            'error': 'API not authenticated. Please configure and authenticate your API in settings.'
+        }, status=401)
+    
+    # Check if token is still valid
+    if not credentials.is_token_valid():
+        return JsonResponse({
+            'error': 'Token expired. Please re-authenticate in settings.'
+        }, status=401)
+    return None
+
 @csrf_exempt
 def fetch_data_api(request):
     """API endpoint to fetch stock data and save to JSON."""
@@ -263,61 +335,66 @@ def fetch_data_api(request):
         if not symbol:
             return JsonResponse({'error': 'Symbol is required'}, status=400)
         
-        # Check if credentials exist and are authenticated
-        credentials = APICredentials.objects.first()
-        if not credentials or not credentials.is_authenticated:
-            return JsonResponse({
-                'error': 'API not authenticated. Please configure and authenticate your API in settings.'
-            }, status=401)
-        
-        # Check if token is still valid
-        if not credentials.is_token_valid():
-            return JsonResponse({
-                'error': 'Token expired. Please re-authenticate in settings.'
-            }, status=401)
-        
-        # Fetch data
-        kite_service = KiteDataService(api_credentials=credentials)
-        
-        # Check if data already exists
-        existing_data = kite_service.load_data_from_json(symbol, from_date, to_date, interval)
-        if existing_data:
-            return JsonResponse({
-                'success': True,
-                'message': f'Data already exists with {existing_data["total_records"]} records',
-                'data_count': existing_data['total_records'],
-                'file_exists': True
-            })
+        auth_error = _check_api_authentication()
+        if auth_error:
+            return auth_error
         
-        # Fetch new data using smart fetching (automatically handles chunking)
-        historical_data = kite_service.fetch_historical_data_smart(
-            symbol=symbol,
-            from_date=from_date,
-            to_date=to_date,
-            interval=interval
-        )
+        # Queue the fetch when a Celery worker is available
+        if celery_enabled():
+            task = fetch_stock_data.delay(symbol, from_date, to_date, interval)
+            return JsonResponse({'task_id': task.id}, status=202)
         
-        # Save to JSON file
-        filepath = kite_service.save_data_to_json(historical_data, symbol, from_date, to_date, interval)
-        filename = os.path.basename(filepath)
+        return JsonResponse(fetch_stock_data(symbol, from_date, to_date, interval))
         
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        logger.error(f"Error fetching data: {e}", exc_info=True)
+        return JsonResponse({'error': f'Error: {str(e)}'}, status=500)
+
+@csrf_exempt
+def fetch_batch_api(request):
+    """API endpoint to fetch several symbols concurrently and save each to JSON."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method allowed'}, status=405)
+    
+    try:
+        data = json.loads(request.body)
+        fetch_requests = data.get('requests')
+        
+        if not fetch_requests or not isinstance(fetch_requests, list):
+            return JsonResponse({'error': 'requests must be a non-empty list'}, status=400)
+        if not all(isinstance(r, dict) and r.get('symbol') for r in fetch_requests):
+            return JsonResponse({'error': 'Symbol is required for every request'}, status=400)
+        
+        auth_error = _check_api_authentication()
+        if auth_error:
+            return auth_error
+        
+        # Queue one fetch per symbol when a Celery worker is available
+        if celery_enabled():
+            task_ids = [
+                fetch_stock_data.delay(r['symbol'].upper(), r.get('from_date'), r.get('to_date'),
+                                       r.get('interval', 'minute')).id
+                for r in fetch_requests
+            ]
+            return JsonResponse({'task_ids': task_ids}, status=202)
+        
+        results = fetch_stock_data_batch(fetch_requests)
         return JsonResponse({
-            'success': True,
-            'message': f'Fetched {len(historical_data)} records and saved to JSON file',
-            'data_count': len(historical_data),
-            'filename': filename,
-            'filepath': filepath
+            'success': all(result['success'] for result in results),
+            'results': results
         })
         
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON data'}, status=400)
     except Exception as e:
-        logger.error(f"Error fetching data: {e}", exc_info=True)
+        logger.error(f"Error fetching batch data: {e}", exc_info=True)
         return JsonResponse({'error': f'Error: {str(e)}'}, status=500)
 
 def test_connection(request):
     """Test API connection."""
-    credentials = APICredentials.objects.first()
+    credentials = get_api_credentials()
     
     if not credentials or not credentials.is_authenticated:
         return JsonResponse({
@@ -326,7 +403,7 @@ def test_connection(request):
         })
     
     try:
-        kite_service = KiteDataService()
+        kite_service = get_default_kite_service()
         profile = kite_service.test_connection(credentials.access_token)
         
         return JsonResponse({
@@ -344,13 +421,13 @@ def test_connection(request):
 
 def strategy_view(request):
     """View to manage and execute trading strategies"""
-    kite_service = KiteDataService()
+    kite_service = get_default_kite_service()
     available_files = kite_service.list_available_data_files()
     
     # Get all strategies and recent backtests
     strategies = TradingStrategy.objects.all()
-    recent_backtests = StrategyBacktest.objects.all()[:10]
-    recent_signals = TradingSignal.objects.all()[:50]
+    recent_backtests = StrategyBacktest.objects.select_related('strategy')[:10]
+    recent_signals = TradingSignal.objects.select_related('strategy').only(*SIGNAL_LIST_FIELDS)[:50]
     
     context = {
         'available_files': available_files,
@@ -380,9 +457,13 @@ def execute_strategy(request):
         if not os.path.exists(file_path):
             return JsonResponse({'error': 'Data file not found'}, status=404)
         
+        # Queue the backtest when a Celery worker is available
+        if celery_enabled():
+            task = run_strategy.delay(file_path, symbol)
+            return JsonResponse({'task_id': task.id}, status=202)
+        
         # Execute strategy
-        strategy_service = TradingStrategyService()
-        results = strategy_service.run_strategy_on_file(file_path, symbol)
+        results = run_strategy(file_path, symbol)
         
         if results["success"]:
             return JsonResponse({
@@ -406,34 +487,77 @@ def execute_strategy(request):
         return JsonResponse({'error': f'Error: {str(e)}'}, status=500)
 
 
+def task_status(request, task_id):
+    """API endpoint to poll a queued strategy run, data fetch or export"""
+    if not celery_enabled():
+        return JsonResponse({'error': 'Background tasks are not enabled'}, status=404)
+    return JsonResponse(get_task_status(task_id))
+
+
+def _signal_cursor(signal):
+    """Keyset pagination cursor for a signal row"""
+    return f"{signal.timestamp.isoformat()}|{signal.id}"
+
+
+def _parse_signal_cursor(value):
+    """Parse a 'timestamp|id' cursor; None when missing or malformed"""
+    try:
+        timestamp, pk = value.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
 def signals_view(request):
     """View to display trading signals"""
     symbol = request.GET.get('symbol')
     strategy_id = request.GET.get('strategy')
     
     # Filter signals
-    signals = TradingSignal.objects.all()
+    signals = TradingSignal.objects.select_related('strategy').only(*SIGNAL_LIST_FIELDS)
     if symbol:
         signals = signals.filter(symbol=symbol)
     if strategy_id:
         signals = signals.filter(strategy_id=strategy_id)
     
-    # Pagination
-    from django.core.paginator import Paginator
-    paginator = Paginator(signals, 50)
-    page = request.GET.get('page', 1)
-    signals_page = paginator.get_page(page)
+    # Keyset pagination over (timestamp, id): no COUNT and no OFFSET scan
+    after = _parse_signal_cursor(request.GET.get('after'))
+    before = _parse_signal_cursor(request.GET.get('before'))
+    if before:
+        # Newer page: walk forward from the cursor, then restore newest-first order
+        timestamp, pk = before
+        page = list(signals.filter(
+            Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+        ).order_by('timestamp', 'id')[:SIGNALS_PAGE_SIZE + 1])
+        has_newer = len(page) > SIGNALS_PAGE_SIZE
+        signals_page = page[:SIGNALS_PAGE_SIZE][::-1]
+        has_older = True
+    else:
+        if after:
+            timestamp, pk = after
+            signals = signals.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+        page = list(signals.order_by('-timestamp', '-id')[:SIGNALS_PAGE_SIZE + 1])
+        has_older = len(page) > SIGNALS_PAGE_SIZE
+        signals_page = page[:SIGNALS_PAGE_SIZE]
+        has_newer = after is not None
     
     # Get available symbols and strategies for filters
-    symbols = TradingSignal.objects.values_list('symbol', flat=True).distinct()
+    # Order by symbol itself: the default -timestamp ordering would be pulled into
+    # the DISTINCT and defeat both the de-duplication and the symbol index
+    symbols = get_signal_symbols(
+        lambda: list(TradingSignal.objects.order_by('symbol').values_list('symbol', flat=True).distinct())
+    )
     strategies = TradingStrategy.objects.all()
     
     context = {
         'signals': signals_page,
+        'newer_cursor': _signal_cursor(signals_page[0]) if has_newer and signals_page else None,
+        'older_cursor': _signal_cursor(signals_page[-1]) if has_older and signals_page else None,
         'symbols': symbols,
         'strategies': strategies,
         'selected_symbol': symbol,
         'selected_strategy': strategy_id,
+        'async_exports': celery_enabled(),
     }
     
     return render(request, 'signals.html', context)
@@ -445,7 +569,7 @@ def backtest_view(request):
     
     if backtest_id:
         try:
-            backtest = StrategyBacktest.objects.get(id=backtest_id)
+            backtest = StrategyBacktest.objects.select_related('strategy').get(id=backtest_id)
             context = {
                 'backtest': backtest,
                 'detailed_view': True
@@ -455,11 +579,12 @@ def backtest_view(request):
             return redirect('backtest_view')
     else:
         # List all backtests
-        backtests = StrategyBacktest.objects.all()
+        backtests = StrategyBacktest.objects.select_related('strategy')
         context = {
             'backtests': backtests,
             'detailed_view': False
         }
+    context['async_exports'] = celery_enabled()
     
     return render(request, 'backtest.html', context)
 
@@ -467,7 +592,7 @@ def backtest_view(request):
 def charts_view(request):
     """View to display strategy charts"""
     # Get all backtests for the dropdown
-    backtests = StrategyBacktest.objects.all().order_by('-created_at')
+    backtests = StrategyBacktest.objects.select_related('strategy').order_by('-created_at')
     
     context = {
         'backtests': backtests,
@@ -476,128 +601,47 @@ def charts_view(request):
     return render(request, 'charts.html', context)
 
 
+def _chart_ndjson_lines(backtest_info, ohlc_data, indicators_data, signals_data):
+    """Yield chart data as NDJSON, one record per line tagged with its type"""
+    yield json_dumps_bytes({'type': 'meta', 'backtest_info': backtest_info}) + b'\n'
+    sections = [
+        ('ohlc', ohlc_data),
+        ('ma', indicators_data['ma']),
+        ('macd', indicators_data['macd']),
+        ('signal', signals_data),
+    ]
+    for record_type, records in sections:
+        # Send lines in batches so each chunk is worth a write
+        for start in range(0, len(records), NDJSON_BATCH_SIZE):
+            yield b''.join(
+                json_dumps_bytes({'type': record_type, **record}) + b'\n'
+                for record in records[start:start + NDJSON_BATCH_SIZE]
+            )
+
+
 @csrf_exempt
 def chart_data_api(request, backtest_id):
     """API endpoint to get chart data for a specific backtest"""
     try:
-        backtest = StrategyBacktest.objects.get(id=backtest_id)
+        backtest = StrategyBacktest.objects.select_related('strategy').get(id=backtest_id)
         logger.info(f"chart_data_api: Loaded backtest {backtest_id} for symbol {backtest.symbol}")
 
-        signals = TradingSignal.objects.filter(
-            symbol=backtest.symbol,
-            timestamp__gte=backtest.from_date,
-            timestamp__lte=backtest.to_date
-        ).order_by('timestamp')
-        logger.info(f"chart_data_api: Found {signals.count()} signals for backtest {backtest_id}")
-
-        kite_service = KiteDataService()
-        available_files = kite_service.list_available_data_files()
-
-        ohlc_data = []
-        indicators_data = {
-            'macd': [],
-            'ma': []
-        }
-
-        for file_info in available_files:
-            if file_info['symbol'] == backtest.symbol:
-                logger.info(f"chart_data_api: Found matching symbol file: {file_info['filepath']}")
-                try:
-                    with open(file_info['filepath'], 'r') as f:
-                        file_data = json.load(f)
-                    logger.info(f"chart_data_api: Loaded file with {len(file_data.get('data', []))} records")
-
-                    for record in file_data.get('data', []):
-                        if isinstance(record, dict):
-                            try:
-                                open_val = float(record.get('open', 0))
-                                high_val = float(record.get('high', 0))
-                                low_val = float(record.get('low', 0))
-                                close_val = float(record.get('close', 0))
-                                volume_val = int(record.get('volume', 0))
-                                date_val = record.get('date') or record.get('timestamp')
-                                if (date_val and open_val > 0 and high_val > 0 and low_val > 0 and close_val > 0):
-                                    ohlc_data.append({
-                                        'date': date_val,
-                                        'open': open_val,
-                                        'high': high_val,
-                                        'low': low_val,
-                                        'close': close_val,
-                                        'volume': volume_val
-                                    })
-                            except (ValueError, TypeError):
-                                continue
-                    logger.info(f"chart_data_api: Extracted {len(ohlc_data)} valid OHLC records")
-
-                    if len(ohlc_data) >= 26:
-                        close_prices = [d['close'] for d in ohlc_data]
-                        for i in range(4, len(ohlc_data)):
-                            try:
-                                ma_prices = close_prices[i-4:i+1]
-                                if all(p > 0 for p in ma_prices):
-                                    ma_value = sum(ma_prices) / 5
-                                    indicators_data['ma'].append({
-                                        'date': ohlc_data[i]['date'],
-                                        'value': ma_value
-                                    })
-                            except (IndexError, ZeroDivisionError):
-                                continue
-                        for i in range(25, len(ohlc_data)):
-                            try:
-                                ema12_prices = close_prices[i-11:i+1]
-                                ema26_prices = close_prices[i-25:i+1]
-                                if (all(p > 0 for p in ema12_prices) and all(p > 0 for p in ema26_prices)):
-                                    ema12 = sum(ema12_prices) / 12
-                                    ema26 = sum(ema26_prices) / 26
-                                    macd_line = ema12 - ema26
-                                    if i > 33:
-                                        recent_macd = [indicators_data['macd'][j]['macd'] for j in range(max(0, len(indicators_data['macd'])-8), len(indicators_data['macd']))]
-                                        recent_macd.append(macd_line)
-                                        signal_line = sum(recent_macd) / len(recent_macd)
-                                    else:
-                                        signal_line = macd_line
-                                    histogram = macd_line - signal_line
-                                    indicators_data['macd'].append({
-                                        'date': ohlc_data[i]['date'],
-                                        'macd': macd_line,
-                                        'signal': signal_line,
-                                        'histogram': histogram
-                                    })
-                            except (IndexError, ZeroDivisionError, TypeError):
-                                continue
-                    break
-                except Exception as e:
-                    logger.error(f"chart_data_api: Error loading data file: {e}")
-                    continue
-
-        signals_data = []
-        for signal in signals:
-            try:
-                price_val = float(signal.price)
-                if price_val > 0:
-                    signals_data.append({
-                        'timestamp': signal.timestamp.isoformat(),
-                        'signal_type': signal.signal_type,
-                        'price': price_val,
-                        'confidence': signal.confidence
-                    })
-            except (ValueError, TypeError):
-                continue
-
-        logger.info(f"chart_data_api: Returning {len(ohlc_data)} OHLC, {len(signals_data)} signals, {len(indicators_data['macd'])} MACD, {len(indicators_data['ma'])} MA")
+        # ?format=ndjson streams one record per line instead of a single JSON document
+        if request.GET.get('format') == 'ndjson':
+            return StreamingHttpResponse(
+                _chart_ndjson_lines(*build_chart_data(backtest)),
+                content_type='application/x-ndjson'
+            )
 
-        return JsonResponse({
-            'success': True,
-            'ohlc_data': ohlc_data,
-            'signals': signals_data,
-            'indicators': indicators_data,
-            'backtest_info': {
-                'symbol': backtest.symbol,
-                'from_date': backtest.from_date.strftime('%Y-%m-%d'),
-                'to_date': backtest.to_date.strftime('%Y-%m-%d'),
-                'strategy_name': backtest.strategy.name
-            }
-        })
+        # Serve the serialized payload straight from cache when available; strategy
+        # runs on Celery warm it in the background (see tasks.precompute_chart_payload)
+        cache_key = chart_cache_key(backtest)
+        payload = cache.get(cache_key)
+        if payload is not None:
+            logger.info(f"chart_data_api: Serving cached chart data for backtest {backtest_id}")
+        else:
+            payload = cache_chart_payload(backtest, cache_key)
+        return HttpResponse(payload, content_type='application/json')
 
     except StrategyBacktest.DoesNotExist:
         logger.error(f"chart_data_api: Backtest {backtest_id} not found")
@@ -625,205 +669,23 @@ def export_strategy_data_to_excel(request):
             messages.error(request, 'Symbol is required for export')
             return redirect('signals_view')
         
-        # Create Excel workbook with multiple sheets
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Sheet 1: Trading Signals
-            signals_query = TradingSignal.objects.filter(symbol=symbol)
-            if strategy_id:
-                signals_query = signals_query.filter(strategy_id=strategy_id)
-                
-            signals = signals_query.order_by('timestamp')
-            
-            if signals.exists():
-                signals_data = []
-                for signal in signals:
-                    try:
-                        indicators = signal.indicators if signal.indicators else {}
-                        # Convert timezone-aware datetimes to naive datetimes for Excel compatibility
-                        timestamp_naive = signal.timestamp.replace(tzinfo=None) if signal.timestamp else None
-                        created_at_naive = signal.created_at.replace(tzinfo=None) if signal.created_at else None
-                        
-                        signals_data.append({
-                            'Timestamp': timestamp_naive,
-                            'Symbol': signal.symbol,
-                            'Strategy': signal.strategy.name if signal.strategy else '',
-                            'Signal_Type': signal.signal_type,
-                            'Price': float(signal.price) if signal.price else 0.0,
-                            'Confidence': float(signal.confidence) if signal.confidence else 0.0,
-                            'MA_5': float(indicators.get('MA_5', 0)) if indicators.get('MA_5') else '',
-                            'MACD': float(indicators.get('MACD', 0)) if indicators.get('MACD') else '',
-                            'MACD_Signal': float(indicators.get('MACD_Signal', 0)) if indicators.get('MACD_Signal') else '',
-                            'MACD_Histogram': float(indicators.get('MACD_Histogram', 0)) if indicators.get('MACD_Histogram') else '',
-                            'Close_Price': float(indicators.get('close', 0)) if indicators.get('close') else '',
-                            'Volume': int(indicators.get('volume', 0)) if indicators.get('volume') else '',
-                            'Created_At': created_at_naive
-                        })
-                    except (ValueError, TypeError, AttributeError) as e:
-                        logger.warning(f"Error processing signal {signal.id}: {e}")
-                        continue
-                
-                if signals_data:
-                    signals_df = pd.DataFrame(signals_data)
-                    signals_df.to_excel(writer, sheet_name='Trading_Signals', index=False)
-                else:
-                    # Create empty sheet if no valid signals
-                    empty_df = pd.DataFrame({'Message': ['No valid signals found']})
-                    empty_df.to_excel(writer, sheet_name='Trading_Signals', index=False)
-            
-            # Sheet 2: Backtest Results
-            backtests_query = StrategyBacktest.objects.filter(symbol=symbol)
-            if strategy_id:
-                backtests_query = backtests_query.filter(strategy_id=strategy_id)
-            if backtest_id:
-                backtests_query = backtests_query.filter(id=backtest_id)
-                
-            backtests = backtests_query.order_by('-created_at')
-            
-            if backtests.exists():
-                backtest_data = []
-                for backtest in backtests:
-                    try:
-                        results_data = backtest.results_data if backtest.results_data else {}
-                        # Convert timezone-aware datetime to naive datetime for Excel compatibility
-                        created_at_naive = backtest.created_at.replace(tzinfo=None) if backtest.created_at else None
-                        
-                        backtest_data.append({
-                            'Backtest_ID': backtest.id,
-                            'Symbol': backtest.symbol,
-                            'Strategy': backtest.strategy.name,
-                            'From_Date': backtest.from_date,
-                            'To_Date': backtest.to_date,
-                            'Total_Trades': backtest.total_trades,
-                            'Winning_Trades': backtest.winning_trades,
-                            'Losing_Trades': backtest.losing_trades,
-                            'Win_Rate_%': float(results_data.get('win_rate', 0)),
-                            'Total_Return_%': float(backtest.total_return),
-                            'Strategy_Return_%': float(backtest.strategy_return),
-                            'Market_Return_%': float(backtest.market_return),
-                            'Buy_Signals_Count': backtest.buy_signals_count,
-                            'Sell_Signals_Count': backtest.sell_signals_count,
-                            'Max_Drawdown_%': float(results_data.get('max_drawdown', 0)),
-                            'Sharpe_Ratio': float(results_data.get('sharpe_ratio', 0)),
-                            'Created_At': created_at_naive
-                        })
-                    except (ValueError, TypeError, AttributeError) as e:
-                        logger.warning(f"Error processing backtest {backtest.id}: {e}")
-                        continue
-                
-                if backtest_data:
-                    backtest_df = pd.DataFrame(backtest_data)
-                    backtest_df.to_excel(writer, sheet_name='Backtest_Results', index=False)
-                else:
-                    # Create empty sheet if no valid backtests
-                    empty_df = pd.DataFrame({'Message': ['No valid backtest results found']})
-                    empty_df.to_excel(writer, sheet_name='Backtest_Results', index=False)
-            
-            # Sheet 3: Signal Summary
-            signal_summary = []
-            buy_signals = signals.filter(signal_type='BUY')
-            sell_signals = signals.filter(signal_type='SELL')
-            hold_signals = signals.filter(signal_type='HOLD')
-            
-            # Use Django aggregation
-            buy_stats = buy_signals.aggregate(
-                count=Count('id'),
-                avg_price=Avg('price'),
-                avg_confidence=Avg('confidence'),
-                min_price=Min('price'),
-                max_price=Max('price')
-            )
-            
-            sell_stats = sell_signals.aggregate(
-                count=Count('id'),
-                avg_price=Avg('price'),
-                avg_confidence=Avg('confidence'),
-                min_price=Min('price'),
-                max_price=Max('price')
+        # ?format=csv streams just the signals, without building a workbook in memory
+        if request.GET.get('format') == 'csv':
+            filename = f"Strategy_Signals_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            response = StreamingHttpResponse(
+                signal_csv_lines(strategy_signals(symbol, strategy_id)), content_type='text/csv'
             )
-            
-            signal_summary.append({
-                'Signal_Type': 'BUY',
-                'Count': buy_stats['count'] or 0,
-                'Avg_Price': buy_stats['avg_price'] or 0,
-                'Avg_Confidence': buy_stats['avg_confidence'] or 0,
-                'Min_Price': buy_stats['min_price'] or 0,
-                'Max_Price': buy_stats['max_price'] or 0
-            })
-            
-            signal_summary.append({
-                'Signal_Type': 'SELL',
-                'Count': sell_stats['count'] or 0,
-                'Avg_Price': sell_stats['avg_price'] or 0,
-                'Avg_Confidence': sell_stats['avg_confidence'] or 0,
-                'Min_Price': sell_stats['min_price'] or 0,
-                'Max_Price': sell_stats['max_price'] or 0
-            })
-            
-            if hold_signals.exists():
-                hold_stats = hold_signals.aggregate(
-                    count=Count('id'),
-                    avg_price=Avg('price'),
-                    avg_confidence=Avg('confidence'),
-                    min_price=Min('price'),
-                    max_price=Max('price')
-                )
-                
-                signal_summary.append({
-                    'Signal_Type': 'HOLD',
-                    'Count': hold_stats['count'] or 0,
-                    'Avg_Price': hold_stats['avg_price'] or 0,
-                    'Avg_Confidence': hold_stats['avg_confidence'] or 0,
-                    'Min_Price': hold_stats['min_price'] or 0,
-                    'Max_Price': hold_stats['max_price'] or 0
-                })
-            
-            summary_df = pd.DataFrame(signal_summary)
-            summary_df.to_excel(writer, sheet_name='Signal_Summary', index=False)
-            
-            # Sheet 4: Strategy Performance Comparison (if multiple strategies)
-            if not strategy_id:
-                all_backtests = StrategyBacktest.objects.filter(symbol=symbol)
-                if all_backtests.exists():
-                    performance_data = []
-                    for backtest in all_backtests:
-                        results_data = backtest.results_data if backtest.results_data else {}
-                        performance_data.append({
-                            'Strategy': backtest.strategy.name,
-                            'Period': f"{backtest.from_date} to {backtest.to_date}",
-                            'Total_Return_%': backtest.total_return,
-                            'Win_Rate_%': results_data.get('win_rate', 0),
-                            'Total_Trades': backtest.total_trades,
-                            'Profit_Factor': results_data.get('profit_factor', 0),
-                            'Max_Drawdown_%': results_data.get('max_drawdown', 0)
-                        })
-                    
-                    performance_df = pd.DataFrame(performance_data)
-                    performance_df.to_excel(writer, sheet_name='Performance_Comparison', index=False)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
         
-        # Prepare response
-        output.seek(0)
+        # ?async=1 builds the workbook on a worker; the page polls task_status for the download link
+        if request.GET.get('async') and celery_enabled():
+            task = export_strategy_data.delay(symbol, strategy_id, backtest_id)
+            return JsonResponse({'task_id': task.id}, status=202)
         
-        # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        strategy_name = ""
-        if strategy_id:
-            try:
-                strategy = TradingStrategy.objects.get(id=strategy_id)
-                strategy_name = f"_{strategy.name}"
-            except TradingStrategy.DoesNotExist:
-                pass
+        output, filename = build_strategy_export(symbol, strategy_id, backtest_id)
         
-        filename = f"Strategy_Data_{symbol}{strategy_name}_{timestamp}.xlsx"
-        
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
         
     except Exception as e:
         logger.error(f"Error exporting strategy data to Excel: {e}", exc_info=True)
@@ -834,136 +696,14 @@ def export_strategy_data_to_excel(request):
 def export_backtest_to_excel(request, backtest_id):
     """Export specific backtest results with detailed analysis to Excel"""
     try:
-        backtest = StrategyBacktest.objects.get(id=backtest_id)
+        if request.GET.get('async') and celery_enabled():
+            task = export_backtest.delay(backtest_id)
+            return JsonResponse({'task_id': task.id}, status=202)
         
-        # Get related signals
-        signals = TradingSignal.objects.filter(
-            symbol=backtest.symbol,
-            strategy=backtest.strategy,
-            timestamp__gte=backtest.from_date,
-            timestamp__lte=backtest.to_date
-        ).order_by('timestamp')
+        backtest = StrategyBacktest.objects.select_related('strategy').get(id=backtest_id)
+        output, filename = build_backtest_export(backtest)
         
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Sheet 1: Backtest Overview
-            overview_data = [{
-                'Metric': 'Symbol',
-                'Value': backtest.symbol
-            }, {
-                'Metric': 'Strategy',
-                'Value': backtest.strategy.name
-            }, {
-                'Metric': 'Period',
-                'Value': f"{backtest.from_date} to {backtest.to_date}"
-            }, {
-                'Metric': 'Total Trades',
-                'Value': backtest.total_trades
-            }, {
-                'Metric': 'Winning Trades',
-                'Value': backtest.winning_trades
-            }, {
-                'Metric': 'Losing Trades',
-                'Value': backtest.losing_trades
-            }, {
-                'Metric': 'Win Rate (%)',
-                'Value': (backtest.winning_trades / backtest.total_trades * 100) if backtest.total_trades > 0 else 0
-            }, {
-                'Metric': 'Total Return (%)',
-                'Value': backtest.total_return
-            }, {
-                'Metric': 'Strategy Return (%)',
-                'Value': backtest.strategy_return
-            }, {
-                'Metric': 'Market Return (%)',
-                'Value': backtest.market_return
-            }, {
-                'Metric': 'Buy Signals Count',
-                'Value': backtest.buy_signals_count
-            }, {
-                'Metric': 'Sell Signals Count',
-                'Value': backtest.sell_signals_count
-            }]
-            
-            overview_df = pd.DataFrame(overview_data)
-            overview_df.to_excel(writer, sheet_name='Backtest_Overview', index=False)
-            
-            # Sheet 2: Trade Signals
-            if signals.exists():
-                signals_data = []
-                trade_number = 1
-                for signal in signals:
-                    try:
-                        indicators = signal.indicators if signal.indicators else {}
-                        # Convert timezone-aware datetime to naive datetime for Excel compatibility
-                        timestamp_naive = signal.timestamp.replace(tzinfo=None) if signal.timestamp else None
-                        
-                        signals_data.append({
-                            'Trade_Number': trade_number if signal.signal_type == 'BUY' else '',
-                            'Timestamp': timestamp_naive,
-                            'Signal_Type': signal.signal_type,
-                            'Price': float(signal.price) if signal.price else 0.0,
-                            'Confidence': float(signal.confidence) if signal.confidence else 0.0,
-                            'MA_5': float(indicators.get('MA_5', 0)) if indicators.get('MA_5') else '',
-                            'MACD': float(indicators.get('MACD', 0)) if indicators.get('MACD') else '',
-                            'MACD_Signal': float(indicators.get('MACD_Signal', 0)) if indicators.get('MACD_Signal') else '',
-                            'MACD_Histogram': float(indicators.get('MACD_Histogram', 0)) if indicators.get('MACD_Histogram') else '',
-                            'Volume': int(indicators.get('volume', 0)) if indicators.get('volume') else '',
-                            'Profit_Loss': '',  # Will be calculated separately
-                            'Profit_Loss_%': ''
-                        })
-                        if signal.signal_type == 'BUY':
-                            trade_number += 1
-                    except (ValueError, TypeError, AttributeError) as e:
-                        logger.warning(f"Error processing signal {signal.id}: {e}")
-                        continue
-                
-                if signals_data:
-                    signals_df = pd.DataFrame(signals_data)
-                    
-                    # Calculate profit/loss for matched buy-sell pairs
-                    buy_signals_data = [s for s in signals_data if s['Signal_Type'] == 'BUY']
-                    sell_signals_data = [s for s in signals_data if s['Signal_Type'] == 'SELL']
-                    
-                    for i, buy in enumerate(buy_signals_data):
-                        if i < len(sell_signals_data):
-                            sell = sell_signals_data[i]
-                            try:
-                                profit_loss = float(sell['Price']) - float(buy['Price'])
-                                profit_loss_pct = (profit_loss / float(buy['Price'])) * 100 if float(buy['Price']) > 0 else 0
-                                
-                                # Update the sell signal row with profit/loss
-                                for idx, row in signals_df.iterrows():
-                                    if (str(row['Timestamp']) == str(sell['Timestamp']) and 
-                                        row['Signal_Type'] == 'SELL' and
-                                        abs(float(row['Price']) - float(sell['Price'])) < 0.01):  # Use small tolerance for float comparison
-                                        signals_df.at[idx, 'Profit_Loss'] = profit_loss
-                                        signals_df.at[idx, 'Profit_Loss_%'] = profit_loss_pct
-                                        break
-                            except (ValueError, TypeError) as e:
-                                logger.warning(f"Error calculating profit/loss for trade {i}: {e}")
-                                continue
-                    
-                    signals_df.to_excel(writer, sheet_name='Trade_Signals', index=False)
-                else:
-                    # Create empty sheet if no valid signals
-                    empty_df = pd.DataFrame({'Message': ['No valid signals found']})
-                    empty_df.to_excel(writer, sheet_name='Trade_Signals', index=False)
-        
-        # Prepare response
-        output.seek(0)
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"Backtest_{backtest.symbol}_{backtest.strategy.name}_{timestamp}.xlsx"
-        
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
         
     except StrategyBacktest.DoesNotExist:
         messages.error(request, 'Backtest not found')
@@ -972,3 +712,13 @@ def export_backtest_to_excel(request, backtest_id):
         logger.error(f"Error exporting backtest to Excel: {e}", exc_info=True)
         messages.error(request, f'Error exporting backtest: {str(e)}')
         return redirect('backtest_view')
+
+
+def download_export(request, token):
+    """Serve a workbook built by a background export"""
+    export = get_export(token)
+    if export is None:
+        messages.error(request, 'Export has expired, please export again')
+        return redirect('signals_view')
+    filename, content = export
+    return FileResponse(BytesIO(content), as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)